@@ -0,0 +1,146 @@
+"""Turn scalar potential functions into ones that take whole arrays.
+
+general_well hands its function the ndarray of grid points. A function
+written for one float at a time, e.g. with math.exp or an if on x, is
+wrapped here instead of having to be rewritten: compiled with numba when
+it is installed, otherwise with np.vectorize, which still loops in Python
+and is warned about once per function.
+
+Potential functions are usually closures made anew on every call, so
+they are told apart by their code and the values they close over, not by
+identity. Closures over anything but plain constants, e.g. the
+InfiniteSquareWell or an array, are compiled per call and not kept.
+
+numba takes the values a closure captures as compile time constants, so
+each new value, e.g. every amplitude of a sweep, means another compile
+that costs far more than it saves. After NUMBA_COMPILES compiles of the
+same code it goes to np.vectorize instead.
+"""
+import warnings
+from collections import OrderedDict
+from types import ModuleType
+
+import numpy as np
+
+
+def main():
+    """Test that re-solving a scalar potential neither re-warns nor grows."""
+    import math
+    import accel  # the module potentials uses, not __main__
+    from potentials import register_potential, general_well
+    from solver import solve
+
+    @register_potential("scalar_bump", "Scalar Bump")
+    def bump(ISW, amplitude):
+        """A gaussian bump written with math.exp."""
+        center = (ISW.well_min + ISW.well_max) / 2.0
+        return general_well(
+            ISW, lambda x: amplitude * math.exp(-(x - center) ** 2),
+            scalar=True)
+
+    accel.clear_cache()
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", accel.AccelerationWarning)
+        first = solve("scalar_bump", 10.0, e_vals=20)
+        size = len(accel._compiled)
+        second = solve("scalar_bump", 10.0, e_vals=20)
+    assert(len(accel._compiled) == size)
+    assert(len(caught) <= 1)
+    assert(np.allclose(first.energies, second.energies))
+    print("scalar_bump:", len(caught), "warning(s),", size,
+          "compiled function(s) after two solves")
+
+
+# number of compiled functions kept around
+COMPILED_CACHE_SIZE = 32
+
+# numba compiles of one code object before falling back to np.vectorize
+NUMBA_COMPILES = 4
+
+# closed over values that tell two closures of the same code apart
+_CONSTANTS = (bool, int, float, complex, str, bytes, type(None), ModuleType)
+
+# (code, closure values, defaults) -> array version, least recent first
+_compiled = OrderedDict()
+
+# code of functions numba failed on, and of those already warned about
+_uncompilable = set()
+_warned = set()
+
+# code -> number of times numba compiled it
+_compiles = {}
+
+
+class AccelerationWarning(UserWarning):
+    """A scalar function runs through a Python loop."""
+
+
+def vectorize(func):
+    """Return func as a function of float arrays, compiled once per func."""
+    key = _key(func)
+    if key is None:
+        return _compile(func)
+    compiled = _compiled.pop(key, None)
+    if compiled is None:
+        compiled = _compile(func)
+    _compiled[key] = compiled
+    while len(_compiled) > COMPILED_CACHE_SIZE:
+        _compiled.popitem(last=False)
+    return compiled
+
+
+def clear_cache():
+    """Forget every compiled function."""
+    _compiled.clear()
+    _uncompilable.clear()
+    _warned.clear()
+    _compiles.clear()
+
+
+def _key(func):
+    """Return what tells func apart from its twins, None if uncacheable."""
+    code = getattr(func, "__code__", None)
+    if code is None:
+        return None
+    try:
+        values = tuple(cell.cell_contents for cell in func.__closure__ or ())
+    except ValueError:  # a cell not filled in yet
+        return None
+    values += func.__defaults__ or ()
+    if not all(isinstance(value, _CONSTANTS) for value in values):
+        return None
+    return (code, values)
+
+
+def _compile(func):
+    """Compile func with numba, or fall back to np.vectorize."""
+    code = getattr(func, "__code__", func)
+    try:
+        import numba
+    except ImportError:
+        reason = "numba is not installed"
+    else:
+        reason = "numba could not compile it"
+        if _compiles.get(code, 0) >= NUMBA_COMPILES:
+            reason = ("numba would compile it again for every new value "
+                      "it closes over")
+        elif code not in _uncompilable:
+            try:
+                compiled = numba.vectorize(["float64(float64)"])(func)
+            except Exception as error:  # numba can't type every function
+                _uncompilable.add(code)
+                reason += " ({})".format(type(error).__name__)
+            else:
+                _compiles[code] = _compiles.get(code, 0) + 1
+                return compiled
+
+    if code not in _warned:
+        _warned.add(code)
+        warnings.warn("{} is evaluated point by point in Python, {}".format(
+            getattr(func, "__qualname__", func), reason),
+            AccelerationWarning, stacklevel=3)
+    return np.vectorize(func, otypes=[float])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Re-solve while the amplitude slider moves, at most once per frame."""
+import threading
+
+from continuation import ContinuationSolver
+from potentials import is_linear
+
+# 30 frames per second
+FRAME_MS = 33
+
+
+class AmplitudeSlider:
+    """Throttle slider moves to the frame rate and solve them quickly.
+
+    Only the newest slider position is solved when a frame comes due.
+    Potentials linear in amplitude go through a ContinuationSolver kept
+    while the other settings stay the same. Its cheap continuation steps
+    run on the Tk thread; building it and full diagonalizations are sent
+    to background, a BackgroundSolver, like every other potential, and
+    every slider result supersedes the requests sent to it before.
+    """
+
+    def __init__(self, root, on_result, background, frame_ms=FRAME_MS):
+        """Attach to root, on_result(potential, solution) gets results."""
+        self.root = root
+        self.on_result = on_result
+        self.background = background
+        self.frame_ms = frame_ms
+
+        self.pending = None       # newest (potential, amplitude, settings)
+        self.scheduled = False
+
+        # the idle ContinuationSolver and its settings; whoever uses it,
+        # the Tk thread or the worker, takes it out first
+        self._lock = threading.Lock()
+        self._solver = None
+        self._solver_key = None
+
+    def move(self, potential, amplitude, **settings):
+        """Record a slider position, solving it on the next frame."""
+        self.pending = (potential, amplitude, settings)
+        if not self.scheduled:
+            self.scheduled = True
+            self.root.after(self.frame_ms, self._frame)
+
+    def _frame(self):
+        """Solve the newest slider position."""
+        self.scheduled = False
+        potential, amplitude, settings = self.pending
+        if not is_linear(potential):
+            self.background.submit(potential, amplitude, **settings)
+            return
+
+        key = (potential, tuple(sorted(settings.items())))
+        solver = self._take(key)
+        if solver is not None:
+            solution = solver.try_solve(amplitude)
+            self._put(key, solver)
+            if solution is not None:
+                # older solves would show an outdated amplitude when done
+                self.background.cancel()
+                self.on_result(potential, solution)
+                return
+
+        self.background.submit_call(
+            potential,
+            lambda: self._solve(key, potential, amplitude, settings),
+            on_result=self.on_result)
+
+    def _solve(self, key, potential, amplitude, settings):
+        """Worker thread: solve fully, building the solver if needed."""
+        solver = self._take(key)
+        if solver is None:
+            solver = ContinuationSolver(potential, **settings)
+        try:
+            return solver.solve(amplitude)
+        finally:
+            self._put(key, solver)
+
+    def _take(self, key):
+        """Take the idle solver for key out, None if there is none."""
+        with self._lock:
+            if self._solver_key != key:
+                return None
+            solver, self._solver = self._solver, None
+            return solver
+
+    def _put(self, key, solver):
+        """Make solver the idle one, replacing any for other settings."""
+        with self._lock:
+            self._solver, self._solver_key = solver, key
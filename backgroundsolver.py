@@ -0,0 +1,111 @@
+"""Run solves on a worker thread so the Tk window never freezes."""
+import queue
+import threading
+
+from solver import solve
+
+
+class BackgroundSolver:
+    """Solve on a worker thread, the newest request superseding older ones.
+
+    Requests that have not started yet are replaced by newer ones. A solve
+    already running cannot be interrupted inside LAPACK, so its result is
+    simply dropped if a newer request came in meanwhile. Results reach the
+    Tk thread through root.after polling, never from the worker directly.
+    """
+
+    def __init__(self, root, on_result, on_busy=None, poll_ms=16,
+                 solve_func=solve):
+        """Attach to root, on_result(potential, solution) gets results.
+
+        on_busy(flag) is told when solving starts and stops, for a busy
+        indicator. poll_ms should stay about one frame. solve_func stands in
+        for solver.solve, e.g. SolutionCache.solve.
+        """
+        self.root = root
+        self.solve_func = solve_func
+        self.on_result = on_result
+        self.on_busy = on_busy
+        self.poll_ms = poll_ms
+
+        self._condition = threading.Condition()
+        self._pending = None      # newest request not yet started
+        self._generation = 0      # number of the newest request
+        self._waiting = False     # whether the newest request has a result
+        self._results = queue.SimpleQueue()
+        self._polling = False
+
+        worker = threading.Thread(target=self._work, daemon=True)
+        worker.start()
+
+    def submit(self, potential, amplitude, **kwargs):
+        """Ask for solve_func(potential, amplitude, **kwargs)."""
+        self.submit_call(potential, lambda: self.solve_func(
+            potential, amplitude, **kwargs))
+
+    def submit_call(self, potential, func, on_result=None):
+        """Ask for func(), a Solution for potential, as the newest request.
+
+        The result goes to on_result(potential, solution) instead of the
+        default callback if on_result is given.
+        """
+        with self._condition:
+            self._generation += 1
+            self._pending = (self._generation, potential, func,
+                             on_result or self.on_result)
+            self._waiting = True
+            self._condition.notify()
+
+        if not self._polling:
+            self._polling = True
+            if self.on_busy is not None:
+                self.on_busy(True)
+            self.root.after(self.poll_ms, self._poll)
+
+    def cancel(self):
+        """Drop every request so far, e.g. when a result came from elsewhere.
+
+        A solve already running finishes, but its result is discarded.
+        """
+        with self._condition:
+            self._generation += 1
+            self._pending = None
+            self._waiting = False
+
+    def _work(self):
+        """Worker thread: take the newest request and solve it, forever."""
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                generation, potential, func, on_result = self._pending
+                self._pending = None
+
+            try:
+                solution = func()
+            except Exception as error:
+                solution = error
+            self._results.put((generation, potential, solution, on_result))
+
+    def _poll(self):
+        """Tk thread: hand over the newest result, keep polling while busy."""
+        newest = None
+        while not self._results.empty():
+            result = self._results.get()
+            if result[0] == self._generation:
+                newest = result
+
+        if newest is not None:
+            _, potential, solution, on_result = newest
+            self._polling = False
+            if self.on_busy is not None:
+                self.on_busy(False)
+            if isinstance(solution, Exception):
+                raise solution  # reported by Tk's callback error handler
+            on_result(potential, solution)
+        elif not self._waiting:
+            self._polling = False  # cancelled, nothing left to wait for
+            if self.on_busy is not None:
+                self.on_busy(False)
+        else:
+            self.root.after(self.poll_ms, self._poll)
@@ -0,0 +1,200 @@
+"""Solve a file of potential configurations without the GUI.
+
+Run as
+
+    python batch.py jobs.csv results/ --k 10 --wavefunctions
+
+The job file is CSV with a header, or JSON Lines (.json, .jsonl) with one
+object per line. Each job has a potential name and optionally amplitude,
+l_bnd, r_bnd and e_vals; missing values take the defaults of
+solver.solve. Jobs are read lazily and solved chunk_size at a time, so
+memory use does not depend on the length of the job file.
+
+The output directory gets
+
+    - energies.csv: one row per job, its parameters and lowest k energies
+    - chunk_NNNNNN.npz: index (n,), energies (n, k) and with wavefunctions
+      set also wavefunctions (n, k, steps+1), padded with NaN where a job
+      has fewer than k states
+    - progress.json: how many jobs and chunks are complete
+
+A chunk counts as complete once its .npz and CSV rows are written, so an
+interrupted run started again with the same arguments picks up after the
+last complete chunk.
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+
+import numpy as np
+
+from infinitesquarewell import InfiniteSquareWell
+from sweep import SweepPoint, sweep
+
+# parameters of a job and their defaults, as in solver.solve
+JOB_DEFAULTS = (("amplitude", 0.0, float), ("l_bnd", -5.0, float),
+                ("r_bnd", 5.0, float), ("e_vals", 10, int))
+
+PROGRESS_FILE = "progress.json"
+ENERGY_FILE = "energies.csv"
+
+
+def read_jobs(path):
+    """Yield a SweepPoint per job in path, reading one line at a time."""
+    with open(path, newline="") as inp:
+        if os.path.splitext(path)[1].lower() in (".json", ".jsonl"):
+            rows = (json.loads(line) for line in inp if line.strip())
+        else:
+            rows = csv.DictReader(inp)
+        for row in rows:
+            yield _job(row)
+
+
+def _job(row):
+    """Turn a parsed row into a SweepPoint, filling in defaults."""
+    if not row.get("potential"):
+        raise ValueError("job without a potential: {}".format(row))
+    values = [row["potential"]]
+    for (name, default, kind) in JOB_DEFAULTS:
+        value = row.get(name)
+        values.append(default if value in (None, "") else kind(value))
+    return SweepPoint(*values)
+
+
+def run_batch(jobs, output, k=10, steps=200, chunk_size=1024,
+              wavefunctions=False, processes=None, progress=None):
+    """Solve every job in the file jobs, writing results into output.
+
+    Resumes after the last complete chunk of an earlier run. processes
+    solves the chunks over one pool of that size, see parallel.py.
+    progress is called as progress(done) after every chunk. Returns the
+    number of jobs done.
+    """
+    os.makedirs(output, exist_ok=True)
+    state = _load_progress(output)
+    energy_path = os.path.join(output, ENERGY_FILE)
+
+    # drop rows an interrupted run wrote after its last complete chunk
+    with open(energy_path, "a+", newline="") as out:
+        out.truncate(state["csv_bytes"])
+        if state["csv_bytes"] == 0:
+            csv.writer(out).writerow(
+                ["job", "potential", "amplitude", "l_bnd", "r_bnd",
+                 "e_vals"] + ["E_{}".format(i+1) for i in range(k)])
+            state["csv_bytes"] = out.tell()
+
+    pool = None
+    if processes is not None:
+        from parallel import SweepPool
+        pool = SweepPool(processes)
+    try:
+        points = itertools.islice(read_jobs(jobs), state["done"], None)
+        while True:
+            chunk = list(itertools.islice(points, chunk_size))
+            if not chunk:
+                break
+            if pool is None:
+                results = sweep(chunk, steps=steps, k=k)
+            else:
+                results = pool.sweep(chunk, steps=steps, k=k)
+            _write_chunk(output, state, chunk, results, k, steps,
+                         wavefunctions)
+            if progress is not None:
+                progress(state["done"])
+    finally:
+        if pool is not None:
+            pool.close()
+    return state["done"]
+
+
+def _write_chunk(output, state, chunk, results, k, steps, wavefunctions):
+    """Write the results of a chunk, then record it as complete in state."""
+    energy_path = os.path.join(output, ENERGY_FILE)
+    first = state["done"]
+    arrays = _collect(results, first, k, steps, wavefunctions)
+
+    _write_atomic(os.path.join(output, "chunk_{:06d}.npz".format(
+        state["chunks"])), lambda out: np.savez(out, **arrays))
+    with open(energy_path, "a", newline="") as out:
+        writer = csv.writer(out)
+        for (index, point, energies) in zip(
+                arrays["index"], chunk, arrays["energies"]):
+            writer.writerow([index, getattr(point.potential, "name",
+                                            point.potential),
+                             point.amplitude, point.l_bnd, point.r_bnd,
+                             point.e_vals] +
+                            ["{:.17g}".format(e) for e in energies])
+        state["csv_bytes"] = out.tell()
+
+    state["done"] += len(chunk)
+    state["chunks"] += 1
+    _write_atomic(os.path.join(output, PROGRESS_FILE),
+                  lambda out: out.write(json.dumps(state).encode()))
+
+
+def _collect(results, first, k, steps, wavefunctions):
+    """Stack the SweepResults of a chunk into padded arrays."""
+    results = list(results)
+    energies = np.full((len(results), k), np.nan)
+    arrays = {"index": np.arange(first, first + len(results)),
+              "energies": energies}
+    if wavefunctions:
+        funcs = np.full((len(results), k, steps+1), np.nan)
+        arrays["wavefunctions"] = funcs
+    for (i, result) in enumerate(results):
+        count = len(result.energies)
+        energies[i, :count] = result.energies
+        if wavefunctions:
+            point = result.point
+            ISW = InfiniteSquareWell(energy_eigenvals=point.e_vals,
+                                     steps=steps, well_min=point.l_bnd,
+                                     well_max=point.r_bnd)
+            funcs[i, :count] = result.vectors.T @ ISW.basis_funcs
+    return arrays
+
+
+def _load_progress(output):
+    """Return the progress of an earlier run in output, or a fresh one."""
+    try:
+        with open(os.path.join(output, PROGRESS_FILE)) as inp:
+            return json.load(inp)
+    except FileNotFoundError:
+        return {"done": 0, "chunks": 0, "csv_bytes": 0}
+
+
+def _write_atomic(path, write):
+    """Call write(file) on a temporary file, then move it to path."""
+    partial = path + ".{}.tmp".format(os.getpid())
+    with open(partial, "wb") as out:
+        write(out)
+    os.replace(partial, path)
+
+
+def main():
+    """Run a batch from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("jobs", help="CSV or JSON Lines job file")
+    parser.add_argument("output", help="directory for the results")
+    parser.add_argument("--k", type=int, default=10,
+                        help="lowest states to keep per job")
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    parser.add_argument("--wavefunctions", action="store_true",
+                        help="also store the states on the grid")
+    parser.add_argument("--processes", type=int,
+                        help="solve over a pool of this many processes")
+    args = parser.parse_args()
+
+    done = run_batch(args.jobs, args.output, k=args.k, steps=args.steps,
+                     chunk_size=args.chunk_size,
+                     wavefunctions=args.wavefunctions,
+                     processes=args.processes,
+                     progress=lambda done: print(done, "jobs done",
+                                                 flush=True))
+    print("finished,", done, "jobs in", args.output)
+
+
+if __name__ == "__main__":
+    main()
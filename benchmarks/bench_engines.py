@@ -0,0 +1,69 @@
+"""Compare the spectral and finite difference engines of solver.solve.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_engines
+
+The reference energies come from the 4th order finite difference engine
+on a grid --refine times finer than the finest one timed, so the error
+column shows how each engine converges towards it.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from solver import solve
+
+
+def timed(func):
+    """Return func() and its wall time."""
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    """Time both engines on sharply localized potentials."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--potentials", nargs="+",
+                        default=["hydrogen", "lennard_jones",
+                                 "kronig_penney"])
+    parser.add_argument("--amplitude", type=float, default=5.0)
+    parser.add_argument("--steps", type=int, nargs="+",
+                        default=[500, 2000, 8000])
+    parser.add_argument("--e-vals", type=int, nargs="+",
+                        default=[20, 50, 100])
+    parser.add_argument("--states", type=int, default=5)
+    parser.add_argument("--refine", type=int, default=4)
+    args = parser.parse_args()
+
+    print("{:<16} {:<22} {:>10} {:>12}".format(
+        "potential", "engine", "time [s]", "max error"))
+    for potential in args.potentials:
+        reference = solve(potential, args.amplitude, e_vals=args.states,
+                          steps=args.refine*max(args.steps),
+                          engine="finite_difference", fd_order=4).energies
+
+        def report(name, solution, seconds):
+            error = np.max(np.abs(solution.energies - reference))
+            print("{:<16} {:<22} {:>10.5f} {:>12.2e}".format(
+                potential, name, seconds, error))
+
+        for n in args.e_vals:
+            solution, seconds = timed(lambda: solve(
+                potential, args.amplitude, e_vals=n, k=args.states,
+                steps=max(args.steps)))
+            report("spectral N={}".format(n), solution, seconds)
+        for order in (2, 4):
+            for steps in args.steps:
+                solution, seconds = timed(lambda: solve(
+                    potential, args.amplitude, e_vals=args.states,
+                    steps=steps, engine="finite_difference",
+                    fd_order=order))
+                report("fd{} steps={}".format(order, steps), solution,
+                       seconds)
+
+
+if __name__ == "__main__":
+    main()
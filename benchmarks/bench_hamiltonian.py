@@ -0,0 +1,66 @@
+"""Compare hamiltonian assembly paths with the legacy mel loop.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_hamiltonian
+"""
+import argparse
+import time
+
+import numpy as np
+
+from potentials import PotentialType
+from infinitesquarewell import InfiniteSquareWell
+from generatehamiltonian import compute_hamiltonian, legacy_hamiltonian
+
+
+def best_time(func, repeat):
+    """Return the fastest of repeat wall times of func()."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    """Time both assembly paths for a range of basis sizes."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10, 50, 100, 200, 500])
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy-max", type=int, default=500,
+                        help="largest basis size to run the legacy loop on")
+    args = parser.parse_args()
+
+    print("{:>6} {:>12} {:>12} {:>14} {:>10} {:>10}".format(
+        "N", "legacy [s]", "batched [s]", "transform [s]", "speedup",
+        "max diff"))
+    for n in args.sizes:
+        ISW = InfiniteSquareWell(energy_eigenvals=n, steps=args.steps,
+                                 well_min=-5.0, well_max=5.0)
+        V = PotentialType.centered_quadratic.get_potential(ISW, 1.0)
+
+        batched = best_time(lambda: compute_hamiltonian(V, ISW), args.repeat)
+        transform = best_time(
+            lambda: compute_hamiltonian(V, ISW, method="transform"),
+            args.repeat)
+        if n > args.legacy_max:
+            print("{:>6} {:>12} {:>12.5f} {:>14.5f} {:>10} {:>10}".format(
+                n, "-", batched, transform, "-", "-"))
+            continue
+
+        # the legacy loop is slow enough that one run is representative
+        start = time.perf_counter()
+        H_legacy = legacy_hamiltonian(V, ISW)
+        legacy = time.perf_counter() - start
+        diff = np.max(np.abs(np.asarray(H_legacy) -
+                             compute_hamiltonian(V, ISW)))
+        print("{:>6} {:>12.5f} {:>12.5f} {:>14.5f} {:>10.1f} {:>10.2e}".format(
+            n, legacy, batched, transform, legacy / batched, diff))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Measure how long a fresh interpreter takes to import the headless core.
+
+The time is reported in total and on top of an interpreter that only
+imports numpy, which every compute path needs anyway. The budget applies
+to the latter, the project's own import cost.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_import
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+# the check run inside each fresh interpreter
+PROBE = """
+import sys
+import {module}
+gui = sorted(m for m in ("tkinter", "matplotlib") if m in sys.modules)
+print(",".join(gui))
+"""
+
+
+def time_import(module, repeat):
+    """Return best start-up times with module and numpy alone, GUI modules."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    numpy_only, times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import numpy"], check=True)
+        numpy_only.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        probe = PROBE.format(module=module)
+        out = subprocess.run([sys.executable, "-c", probe], cwd=root,
+                             check=True, capture_output=True,
+                             text=True).stdout
+        times.append(time.perf_counter() - start)
+    return min(times), min(numpy_only), out.strip()
+
+
+def main():
+    """Print start-up cost per module, exit non-zero if over budget."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+",
+                        default=["solver", "sweep", "main"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=0.1,
+                        help="seconds allowed on top of importing numpy")
+    args = parser.parse_args()
+
+    failed = False
+    print("{:>8} {:>10} {:>10} {:>10}  {}".format(
+        "module", "total [s]", "numpy [s]", "own [s]", "gui modules"))
+    for module in args.modules:
+        total, numpy, gui = time_import(module, args.repeat)
+        print("{:>8} {:>10.4f} {:>10.4f} {:>10.4f}  {}".format(
+            module, total, numpy, total - numpy, gui or "-"))
+        failed |= bool(gui) or total - numpy > args.budget
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
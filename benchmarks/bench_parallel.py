@@ -0,0 +1,73 @@
+"""Measure how a large sweep scales with the number of worker processes.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_parallel
+
+Every point samples and assembles its own potential, so assembly scales
+with the pool along with the eigensolve. The scaling has only been run
+on a single core so far, where process start-up dominates; numbers for
+a many-core machine have not been recorded yet.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from potentials import register_potential, general_well
+from sweep import parameter_grid, sweep
+from parallel import parallel_sweep
+
+
+# registered at import, so spawned workers see it too
+@register_potential("saturating_well", "Saturating Well")
+def saturating_well(ISW, amplitude):
+    """A well not linear in amplitude, so sweep can't reuse its matrix."""
+    return general_well(
+        ISW, lambda x: amplitude * x * x / (1.0 + amplitude * x * x / 100.0))
+
+
+def main():
+    """Time the same sweep serially and with growing process pools."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=4096)
+    parser.add_argument("--e-vals", type=int, default=100)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--processes", type=int, nargs="+")
+    args = parser.parse_args()
+
+    cores = os.cpu_count()
+    counts = args.processes or [2 ** i for i in range(cores.bit_length())
+                                if 2 ** i <= cores]
+    # registered non-linear and assembled by quadrature, so every point
+    # pays for its own potential matrix
+    amplitudes = np.linspace(0.0, 50.0, args.points)
+    points = list(parameter_grid(["saturating_well"], amplitudes,
+                                 [(-5.0, 5.0)], [args.e_vals]))
+
+    start = time.perf_counter()
+    for _ in sweep(points, steps=args.steps, k=10, analytic=False):
+        pass
+    serial = time.perf_counter() - start
+    print("{} points, N={}, steps={}, {} cores".format(
+        len(points), args.e_vals, args.steps, cores))
+    print("{:>10} {:>10} {:>10} {:>11}".format(
+        "processes", "time [s]", "speedup", "efficiency"))
+    print("{:>10} {:>10.3f} {:>10.2f} {:>11.2f}".format(
+        "serial", serial, 1.0, 1.0))
+
+    for count in counts:
+        start = time.perf_counter()
+        for _ in parallel_sweep(points, processes=count, steps=args.steps,
+                                chunk_size=args.chunk_size, k=10,
+                                analytic=False):
+            pass
+        elapsed = time.perf_counter() - start
+        print("{:>10} {:>10.3f} {:>10.2f} {:>11.2f}".format(
+            count, elapsed, serial / elapsed, serial / elapsed / count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Time each stage of the solve pipeline and check it against a baseline.
+
+Run from the repository root with
+
+    python -m benchmarks.bench_pipeline --output results.json
+    python -m benchmarks.bench_pipeline --baseline results.json
+
+Every registered potential is solved for each (e_vals, steps) size. The
+stages are timed separately: basis generation, sampling the potential,
+assembling the hamiltonian, the eigensolve and reconstructing the
+eigenstates on the grid. The eigensolver returns its values sorted, so
+there is no sorting stage left to time. Peak memory of each stage is
+measured in a separate traced run, so tracing does not skew the times.
+
+Two cases have analytic energies to check accuracy against: the empty
+well, and a quadratic well steep enough that its low states are those of
+a harmonic oscillator. Against a baseline, a stage is a regression when
+it is slower by more than --tolerance, or an error when its accuracy got
+worse, and the exit status is then 1.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from potentials import get_potential, get_kernel, registered_potentials
+from infinitesquarewell import InfiniteSquareWell, clear_basis_cache
+from generatehamiltonian import compute_hamiltonian
+from eigensolvers import solve_eigensystem
+from solver import Solution
+
+STAGES = ("basis", "potential", "hamiltonian", "eigensolve",
+          "reconstruction")
+
+# bounds and amplitude of every case
+L_BND, R_BND, AMPLITUDE = -5.0, 5.0, 1.0
+
+# potential, amplitude and the number of states with known energies
+REFERENCES = (("square", 0.0, 5), ("quadratic", 50.0, 5))
+
+# stages faster than this are too noisy to flag
+NOISE_FLOOR = 1e-3
+
+
+def reference_energies(potential, amplitude, count, hbar=1.0, mass=1.0):
+    """Analytic energies of the lowest count states of a reference case."""
+    n = np.arange(count, dtype=float)
+    if potential == "square":
+        L = R_BND - L_BND
+        return ((n + 1) * hbar * np.pi / L) ** 2 / (2.0 * mass)
+    # amplitude * x^2 = mass * omega^2 * x^2 / 2
+    omega = np.sqrt(2.0 * amplitude / mass)
+    return hbar * omega * (n + 0.5)
+
+
+def run_pipeline(potential, amplitude, e_vals, steps, clock):
+    """Solve once, timing every stage with clock, and return the energies.
+
+    clock(stage) is a context manager wrapped around each stage.
+    """
+    with clock("basis"):
+        clear_basis_cache()
+        ISW = InfiniteSquareWell(energy_eigenvals=e_vals, steps=steps,
+                                 well_min=L_BND, well_max=R_BND)
+    with clock("potential"):
+        V = get_potential(potential, ISW, amplitude)
+    with clock("hamiltonian"):
+        kernel = get_kernel(potential, ISW, amplitude)
+        H = compute_hamiltonian(V, ISW, kernel=kernel)
+    with clock("eigensolve"):
+        vals, vecs = solve_eigensystem(H)
+    with clock("reconstruction"):
+        Solution(vals, vecs, ISW.xvals, V, ISW.basis_funcs).wavefunctions()
+    return vals
+
+
+class _Timer:
+    """Keep the best wall time of each stage over repeated runs."""
+
+    def __init__(self):
+        self.best = {}
+
+    def __call__(self, stage):
+        self.stage = stage
+        return self
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        self.best[self.stage] = min(self.best.get(self.stage, elapsed),
+                                    elapsed)
+
+
+class _Tracer:
+    """Record the peak traced memory of each stage above its start."""
+
+    def __init__(self):
+        self.peak = {}
+
+    def __call__(self, stage):
+        self.stage = stage
+        return self
+
+    def __enter__(self):
+        tracemalloc.reset_peak()
+        self.start = tracemalloc.get_traced_memory()[0]
+
+    def __exit__(self, *exc):
+        self.peak[self.stage] = tracemalloc.get_traced_memory()[1] - \
+            self.start
+
+
+def measure(potential, amplitude, e_vals, steps, repeat):
+    """Return the result record of one case."""
+    timer = _Timer()
+    for _ in range(repeat):
+        vals = run_pipeline(potential, amplitude, e_vals, steps, timer)
+
+    tracer = _Tracer()
+    tracemalloc.start()
+    try:
+        run_pipeline(potential, amplitude, e_vals, steps, tracer)
+    finally:
+        tracemalloc.stop()
+
+    return {"potential": potential, "amplitude": amplitude,
+            "e_vals": e_vals, "steps": steps,
+            "time": timer.best, "peak_bytes": tracer.peak,
+            "total_time": sum(timer.best.values()),
+            "energies": vals[:5].tolist()}
+
+
+def accuracy(record, count):
+    """Largest error of the lowest count energies of a reference case."""
+    exact = reference_energies(record["potential"], record["amplitude"],
+                               count)
+    return float(np.max(np.abs(np.array(record["energies"][:count]) -
+                               exact)))
+
+
+def compare(results, baseline, tolerance):
+    """Return messages describing every regression against baseline."""
+    def key(record):
+        return (record["potential"], record["amplitude"], record["e_vals"],
+                record["steps"])
+
+    old = {key(record): record for record in baseline["results"]}
+    regressions = []
+    for record in results["results"]:
+        before = old.get(key(record))
+        if before is None:
+            continue
+        name = "{} a={} N={} steps={}".format(*key(record))
+        for stage in STAGES:
+            now, then = record["time"][stage], before["time"][stage]
+            if now > NOISE_FLOOR and now > then * (1.0 + tolerance):
+                regressions.append("{}: {} took {:.4f}s, was {:.4f}s".format(
+                    name, stage, now, then))
+        if "error" in record and "error" in before and \
+                record["error"] > max(2.0 * before["error"], 1e-10):
+            regressions.append("{}: error {:.3e}, was {:.3e}".format(
+                name, record["error"], before["error"]))
+    return regressions
+
+
+def main():
+    """Run every case, write the results and compare with a baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["10x200", "50x1000",
+                                                       "200x4000"],
+                        help="e_vals x steps of each size")
+    parser.add_argument("--potentials", nargs="+",
+                        default=registered_potentials())
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the results to this file")
+    parser.add_argument("--baseline", help="results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative slowdown of a stage")
+    args = parser.parse_args()
+
+    sizes = [tuple(int(n) for n in size.split("x")) for size in args.sizes]
+    cases = [(potential, AMPLITUDE, None) for potential in args.potentials]
+    cases += list(REFERENCES)
+
+    results = {"python": sys.version.split()[0], "numpy": np.__version__,
+               "machine": platform.machine(), "results": []}
+    print("{:<20} {:>6} {:>6} ".format("potential", "N", "steps") +
+          " ".join("{:>14}".format(stage) for stage in STAGES) +
+          " {:>10} {:>10}".format("peak [MB]", "error"))
+    for (potential, amplitude, count) in cases:
+        for (e_vals, steps) in sizes:
+            record = measure(potential, amplitude, e_vals, steps,
+                             args.repeat)
+            error = "-"
+            if count is not None:
+                record["error"] = accuracy(record, min(count, e_vals))
+                error = "{:.2e}".format(record["error"])
+            results["results"].append(record)
+            print("{:<20} {:>6} {:>6} ".format(potential, e_vals, steps) +
+                  " ".join("{:>14.6f}".format(record["time"][stage])
+                           for stage in STAGES) +
+                  " {:>10.2f} {:>10}".format(
+                      max(record["peak_bytes"].values()) / 2**20, error))
+
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(results, out, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as inp:
+            regressions = compare(results, json.load(inp), args.tolerance)
+        for message in regressions:
+            print("REGRESSION", message)
+        if regressions:
+            sys.exit(1)
+        print("no regressions against", args.baseline)
+
+
+if __name__ == "__main__":
+    main()
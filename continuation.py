@@ -0,0 +1,136 @@
+"""Fast re-solves for small changes of the potential amplitude."""
+import numpy as np
+import numpy.linalg as la
+
+from potentials import get_potential, get_kernel, is_linear
+from infinitesquarewell import InfiniteSquareWell
+from generatehamiltonian import potential_matrix
+from solver import Solution
+
+
+class ContinuationSolver:
+    """Follow the lowest k states of H(a) = H0 + a*V1 as a changes.
+
+    A full diagonalization at an anchor amplitude a0 provides a subspace of
+    the lowest k + buffer eigenvectors. Nearby amplitudes are solved by
+    Rayleigh-Ritz in that subspace, then refined by a few Davidson steps
+    that widen it by the preconditioned residuals. A result is accepted
+    once the energy error bound |r|^2 / gap is below tol, where gap
+    separates the lowest k states from the rest and uses Weyl's bound for
+    states outside the subspace. Otherwise, e.g. at a level crossing, a
+    full diagonalization makes the amplitude the new anchor. Accepted
+    results become the starting subspace of the next solve.
+    """
+
+    def __init__(self, potential_choice, k=10, buffer=None, e_vals=10,
+                 l_bnd=-5.0, r_bnd=5.0, steps=200, analytic=True,
+                 assembly="quadrature", tol=1e-8, refine=3):
+        """Assemble H0 and V1 once for a potential linear in amplitude."""
+        if not is_linear(potential_choice):
+            raise ValueError("continuation needs a potential registered "
+                             "with linear=True")
+        self.ISW = InfiniteSquareWell(energy_eigenvals=e_vals, steps=steps,
+                                      well_min=l_bnd, well_max=r_bnd)
+        self.k = min(k, e_vals)
+        if buffer is None:
+            buffer = self.k
+        self.size = min(e_vals, self.k + buffer)
+        self.tol = tol
+        self.refine = refine
+
+        self.V1_samples = get_potential(potential_choice, self.ISW, 1.0)
+        kernel = None
+        if analytic:
+            kernel = get_kernel(potential_choice, self.ISW, 1.0)
+        self.V1 = potential_matrix(self.V1_samples, self.ISW, kernel=kernel,
+                                   method=assembly)
+        # bounds the 2-norm of the symmetric V1 without an SVD
+        self.V1_norm = np.abs(self.V1).sum(axis=1).max()
+
+        self.anchor = None   # amplitude of the last full diagonalization
+        self.full_solves = 0
+        self.fast_solves = 0
+
+    def solve(self, amplitude):
+        """Return the Solution at amplitude, reusing the anchor if possible."""
+        solution = self.try_solve(amplitude)
+        if solution is None:
+            self.full_solves += 1
+            solution = self._solution(amplitude,
+                                      *self._diagonalize(amplitude))
+        return solution
+
+    def try_solve(self, amplitude):
+        """Return the Solution at amplitude from the anchor alone.
+
+        None if there is no anchor yet or the result can't be trusted, in
+        which case solve has to diagonalize fully.
+        """
+        if self.anchor is None:
+            return None
+        result = self._continue(amplitude)
+        if result is None:
+            return None
+        self.fast_solves += 1
+        return self._solution(amplitude, *result)
+
+    def _hamiltonian(self, amplitude):
+        """H0 + amplitude * V1 as a dense matrix."""
+        H = self.V1 * amplitude
+        H[np.diag_indices(len(H))] += self.ISW.eigenvals
+        return H
+
+    def _diagonalize(self, amplitude):
+        """Fully solve at amplitude and keep its subspace as the anchor."""
+        vals, vecs = la.eigh(self._hamiltonian(amplitude))
+        # lowest energy outside the subspace, infinite if there is none
+        self.outside = vals[self.size] if len(vals) > self.size else np.inf
+        self.full_anchor = amplitude
+        self._set_anchor(amplitude, vals[:self.size], vecs[:, :self.size])
+        return vals[:self.k], vecs[:, :self.k]
+
+    def _set_anchor(self, amplitude, vals, vecs):
+        """Use vecs, eigenvectors at amplitude, as the starting subspace."""
+        self.anchor = amplitude
+        self.Q = vecs
+        self.Lambda = vals
+        self.P = vecs.T @ (self.V1 @ vecs)
+
+    def _continue(self, amplitude):
+        """Solve near the anchor, None if the result can't be trusted."""
+        # Weyl: states outside the subspace moved by at most this much
+        floor = self.outside - abs(amplitude - self.full_anchor) * self.V1_norm
+
+        # Rayleigh-Ritz in the anchor subspace, O(size^3)
+        step = amplitude - self.anchor
+        theta, Y = la.eigh(np.diag(self.Lambda) + step * self.P)
+        X = self.Q @ Y
+        H = self._hamiltonian(amplitude)
+        diagonal = np.diag(H)
+        for _ in range(self.refine + 1):
+            if floor <= theta[self.k - 1]:
+                return None  # a state may have crossed in from outside
+            residual = H @ X[:, :self.k] - X[:, :self.k] * theta[:self.k]
+            upper = floor
+            if len(theta) > self.k:
+                upper = min(floor, theta[self.k])
+            gap = upper - theta[self.k - 1]
+            worst = np.max(np.sum(residual * residual, axis=0))
+            if gap > 0 and worst / gap < self.tol:
+                self._set_anchor(amplitude, theta[:self.size],
+                                 X[:, :self.size])
+                return theta[:self.k], X[:, :self.k]
+
+            # Davidson step: widen the subspace by preconditioned residuals
+            shift = diagonal[:, None] - theta[:self.k]
+            shift[np.abs(shift) < 1e-8] = 1e-8
+            S, _ = la.qr(np.hstack((X, residual / shift)))
+            theta, Y = la.eigh(S.T @ H @ S)
+            X = S @ Y
+        return None
+
+    def _solution(self, amplitude, vals, vecs):
+        """Wrap eigenpairs at amplitude in a Solution."""
+        V = amplitude * self.V1_samples
+        V[[0, -1]] = self.V1_samples[[0, -1]]  # walls don't scale
+        return Solution(vals, vecs, self.ISW.xvals, V, self.ISW.basis_funcs)
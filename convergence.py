@@ -0,0 +1,88 @@
+"""Grow the basis until the lowest energies stop changing."""
+import warnings
+from collections import namedtuple
+
+import numpy as np
+import numpy.linalg as la
+
+from potentials import get_potential, get_kernel
+from infinitesquarewell import InfiniteSquareWell
+from generatehamiltonian import potential_matrix, extend_potential_matrix
+
+# outcome of converge
+#  - n: basis size the energies converged at, or the last one tried
+#  - energies, eigenvectors: lowest k states at that size
+#  - history: (n, energies) for every size tried
+#  - converged: whether the change fell below tol before n_max
+ConvergenceResult = namedtuple(
+    "ConvergenceResult",
+    ["n", "energies", "eigenvectors", "history", "converged"])
+
+
+def converge(potential_choice, potential_amplitude, k=5, tol=1e-6,
+             n_start=10, growth=2, n_max=1000, l_bnd=-5.0, r_bnd=5.0,
+             steps=200, analytic=True, assembly="quadrature"):
+    """Solve at growing basis sizes until the lowest k energies settle.
+
+    The potential matrix is extended with only the new rows and columns
+    at every step, and the eigensolver starts from the previous lowest
+    eigenvectors padded with zeros. The loop stops when no energy moved by
+    more than tol, or at n_max.
+    """
+    n = max(n_start, k)
+    ISW = InfiniteSquareWell(energy_eigenvals=n, steps=steps,
+                             well_min=l_bnd, well_max=r_bnd)
+    V = get_potential(potential_choice, ISW, potential_amplitude)
+    kernel = None
+    if analytic:
+        kernel = get_kernel(potential_choice, ISW, potential_amplitude)
+
+    matrix = potential_matrix(V, ISW, kernel=kernel, method=assembly)
+    vals, vecs = _lowest(matrix + np.diag(ISW.eigenvals), k, None)
+    history = [(n, vals)]
+
+    while n < n_max:
+        n = min(int(np.ceil(n * growth)), n_max)
+        ISW = InfiniteSquareWell(energy_eigenvals=n, steps=steps,
+                                 well_min=l_bnd, well_max=r_bnd)
+        matrix = extend_potential_matrix(matrix, V, ISW, kernel=kernel,
+                                         method=assembly)
+
+        guess = np.zeros((n, k))
+        guess[:len(vecs)] = vecs
+        new_vals, vecs = _lowest(matrix + np.diag(ISW.eigenvals), k, guess)
+        history.append((n, new_vals))
+
+        change = np.max(np.abs(new_vals - vals))
+        vals = new_vals
+        if change < tol:
+            return ConvergenceResult(n, vals, vecs, history, True)
+
+    return ConvergenceResult(n, vals, vecs, history, False)
+
+
+def _lowest(H, k, guess):
+    """Lowest k eigenpairs of H, iterating from guess when there is one."""
+    if guess is not None and len(H) >= 5 * k:
+        try:
+            from scipy.sparse import diags
+            from scipy.sparse.linalg import lobpcg
+        except ImportError:
+            lobpcg = None
+        if lobpcg is not None:
+            # the kinetic diagonal dominates, precondition with its inverse,
+            # kept sparse so applying it costs O(N k) and not O(N^2 k)
+            shift = np.min(np.sum(guess * (H @ guess), axis=0))
+            precondition = diags(1.0 / (np.abs(np.diag(H) - shift) + 1.0))
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", UserWarning)
+                vals, vecs = lobpcg(H, guess, M=precondition,
+                                    largest=False, tol=1e-10, maxiter=200)
+            # only trust the warm start if every state really converged
+            residual = la.norm(H @ vecs - vecs * vals, axis=0)
+            if np.all(residual < 1e-8 * max(1.0, np.max(np.abs(vals)))):
+                order = np.argsort(vals)
+                return vals[order], vecs[:, order]
+
+    vals, vecs = la.eigh(H)
+    return vals[:k], vecs[:, :k]
@@ -0,0 +1,102 @@
+"""Eigensolvers for the real symmetric hamiltonian matrix.
+
+Every solver returns (vals, vecs) sorted by ascending energy, vecs holding
+one eigenvector per column. The subset, banded and sparse solvers need scipy.
+"""
+import numpy as np
+import numpy.linalg as la
+
+# solvers understood by solve_eigensystem
+SOLVERS = ("auto", "dense", "subset", "banded", "sparse")
+
+# above this dimension "auto" prefers the iterative solver for few states
+SPARSE_THRESHOLD = 2000
+
+
+def dense(H, k=None):
+    """Diagonalize all of H with numpy's symmetric solver."""
+    vals, vecs = la.eigh(H)
+    if k is not None:
+        vals, vecs = vals[:k], vecs[:, :k]
+    return vals, vecs
+
+
+def subset(H, k=None):
+    """Compute only the lowest k states with LAPACK's subset driver."""
+    import scipy.linalg
+
+    n = len(H)
+    if k is None or k >= n:
+        return dense(H)
+    return scipy.linalg.eigh(H, subset_by_index=(0, k - 1), driver="evr")
+
+
+def banded(H, k=None, bandwidth=None, tol=1e-12):
+    """Diagonalize H stored as a band, dropping elements below tol.
+
+    Only worth it for potentials whose matrix elements die off away from the
+    diagonal; bandwidth is detected from tol if not given.
+    """
+    import scipy.linalg
+
+    H = np.asarray(H)
+    n = len(H)
+    if bandwidth is None:
+        bandwidth = _bandwidth(H, tol)
+
+    # upper band storage: row u - d holds the d-th superdiagonal
+    band = np.zeros((bandwidth + 1, n))
+    for d in range(bandwidth + 1):
+        band[bandwidth - d, d:] = np.diagonal(H, d)
+
+    if k is None or k >= n:
+        return scipy.linalg.eig_banded(band)
+    return scipy.linalg.eig_banded(band, select="i", select_range=(0, k - 1))
+
+
+def sparse(H, k=None):
+    """Find the lowest k states iteratively with ARPACK's Lanczos solver."""
+    import scipy.sparse.linalg
+
+    n = len(H)
+    if k is None or k >= n - 1:  # ARPACK cannot return every state
+        return dense(H, k)
+    vals, vecs = scipy.sparse.linalg.eigsh(H, k=k, which="SA")
+    order = np.argsort(vals)
+    return vals[order], vecs[:, order]
+
+
+def solve_eigensystem(H, k=None, method="auto"):
+    """Return the lowest k eigenpairs of H, all of them if k is None."""
+    if method == "auto":
+        method = _choose_method(len(H), k)
+    if method == "dense":
+        return dense(H, k)
+    elif method == "subset":
+        return subset(H, k)
+    elif method == "banded":
+        return banded(H, k)
+    elif method == "sparse":
+        return sparse(H, k)
+    raise ValueError("unknown eigensolver '{}', expected one of {}".format(
+        method, SOLVERS))
+
+
+def _choose_method(n, k):
+    """Pick the cheapest solver that is installed for n states, k wanted."""
+    if k is None or k >= n:
+        return "dense"
+    try:
+        import scipy.linalg  # noqa: F401
+    except ImportError:
+        return "dense"
+    if n > SPARSE_THRESHOLD and 10 * k < n:
+        return "sparse"
+    return "subset"
+
+
+def _bandwidth(H, tol):
+    """Largest distance from the diagonal of an element above tol."""
+    scale = tol * max(np.max(np.abs(H)), 1.0)
+    rows, cols = np.nonzero(np.abs(np.triu(H)) > scale)
+    return int(np.max(cols - rows)) if len(rows) else 0
@@ -0,0 +1,82 @@
+"""Real-space finite difference engine for the Schrodinger equation.
+
+The kinetic operator is discretized directly on the points inside the
+well, with the wavefunction zero at both walls. The result is a banded
+symmetric matrix whose lowest states cost O(steps) each to find with
+sparse shift-invert iteration.
+"""
+import numpy as np
+import numpy.linalg as la
+
+from infinitesquarewell import InfiniteSquareWell
+
+# accuracy orders of the kinetic stencil
+ORDERS = (2, 4)
+
+
+def fd_bands(V, ISW, order=2):
+    """Return the bands of the finite difference hamiltonian.
+
+    bands[d] is the d-th superdiagonal over the steps-1 inner points. The
+    4th order stencil uses the odd reflection of the wavefunction at the
+    walls for the points beyond them.
+    """
+    assert(isinstance(ISW, InfiniteSquareWell))
+    inner = np.asarray(V, dtype=float)[1:-1]
+    scale = ISW.hbar ** 2 / (2.0 * ISW.mass * ISW.step_size ** 2)
+    points = len(inner)
+
+    if order == 2:
+        # -f'' ~ (-f[j-1] + 2 f[j] - f[j+1]) / h^2
+        return [inner + 2.0 * scale, np.full(points - 1, -scale)]
+    if order == 4:
+        # -f'' ~ (f[j-2] - 16 f[j-1] + 30 f[j] - 16 f[j+1] + f[j+2]) / 12h^2
+        scale /= 12.0
+        diagonal = inner + 30.0 * scale
+        diagonal[[0, -1]] -= scale  # f[-1] = -f[1] beyond the walls
+        return [diagonal, np.full(points - 1, -16.0 * scale),
+                np.full(points - 2, scale)]
+    raise ValueError("unsupported order {}, expected one of {}".format(
+        order, ORDERS))
+
+
+def solve_finite_difference(V, ISW, k=None, order=2):
+    """Lowest k states of the finite difference hamiltonian.
+
+    Returns energies (k,) and the states sampled on all of ISW.xvals,
+    walls included, as columns of a (steps+1, k) array normalized so
+    that the integral of |psi|^2 is one.
+    """
+    bands = fd_bands(V, ISW, order)
+    points = len(bands[0])
+    k = points if k is None else min(k, points)
+
+    try:
+        import scipy.sparse
+        import scipy.sparse.linalg
+    except ImportError:
+        scipy = None
+
+    if scipy is None or 2 * k >= points:
+        H = np.diag(bands[0])
+        for (d, band) in enumerate(bands[1:], 1):
+            H += np.diag(band, d) + np.diag(band, -d)
+        vals, vecs = la.eigh(H)
+        vals, vecs = vals[:k], vecs[:, :k]
+    else:
+        # the kinetic part is positive, so no state lies below min(V);
+        # shift-invert just under it finds the lowest states with one
+        # banded LU, accurate even where V reaches huge values
+        shift = np.min(np.asarray(V, dtype=float)[1:-1]) - \
+            (ISW.hbar * np.pi / ISW.well_width) ** 2 / (2.0 * ISW.mass)
+        offsets = range(1 - len(bands), len(bands))
+        H = scipy.sparse.diags([bands[abs(d)] for d in offsets], offsets,
+                               format="csc")
+        vals, vecs = scipy.sparse.linalg.eigsh(H, k=k, sigma=shift,
+                                               which="LM")
+        rank = np.argsort(vals)
+        vals, vecs = vals[rank], vecs[:, rank]
+
+    states = np.zeros((points + 2, k))
+    states[1:-1] = vecs / np.sqrt(ISW.step_size)
+    return vals, states
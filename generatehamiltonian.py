@@ -1,7 +1,14 @@
 """Generate the hamiltonian given a basis and potential."""
 from infinitesquarewell import InfiniteSquareWell
+from instrumentation import stage
 import numpy as np
 
+# rules understood by quadrature_weights
+QUADRATURE_RULES = ("mean", "trapezoid", "simpson")
+
+# ways compute_hamiltonian can integrate a sampled potential
+METHODS = ("quadrature", "transform")
+
 
 def mel(psil, V, psir, ISW):
     """Compute matrix element using average value theorem."""
@@ -13,8 +20,8 @@ def mel(psil, V, psir, ISW):
     return float(ISW.well_width * el)
 
 
-def compute_hamiltonian(V, ISW):
-    """Compute discretized hamiltonian."""
+def legacy_hamiltonian(V, ISW):
+    """Compute discretized hamiltonian one element at a time with mel."""
     assert(isinstance(ISW, InfiniteSquareWell))
     hamiltonian = []
     for i in range(ISW.energy_eigenvals):
@@ -28,3 +35,203 @@ def compute_hamiltonian(V, ISW):
             el = 0.0
         hamiltonian.append(row)
     return hamiltonian
+
+
+def quadrature_weights(ISW, rule="mean"):
+    """Return the integration weights of rule on the grid ISW.xvals.
+
+    - mean: average value theorem, same as mel
+    - trapezoid: composite trapezoid rule
+    - simpson: composite Simpson rule, needs an even number of steps
+    """
+    assert(isinstance(ISW, InfiniteSquareWell))
+    points = ISW.steps + 1
+    if rule == "mean":
+        return np.full(points, ISW.well_width / points)
+
+    h = ISW.step_size
+    if rule == "trapezoid":
+        weights = np.full(points, h)
+        weights[[0, -1]] = 0.5 * h
+        return weights
+    if rule == "simpson":
+        if ISW.steps % 2:
+            raise ValueError(
+                "simpson rule needs an even number of steps, got {}".format(
+                    ISW.steps))
+        weights = np.full(points, 2.0 * h / 3.0)
+        weights[1::2] = 4.0 * h / 3.0
+        weights[[0, -1]] = h / 3.0
+        return weights
+    raise ValueError("unknown quadrature rule '{}', expected one of {}".format(
+        rule, QUADRATURE_RULES))
+
+
+def compute_hamiltonian(V, ISW, rule="mean", block_size=64, kernel=None,
+                        method="quadrature", dtype=float, states=None):
+    """Compute discretized hamiltonian as an ndarray in one batched step.
+
+    The potential part comes from potential_matrix, the kinetic part is the
+    ISW energies on the diagonal. states restricts it to those basis
+    functions, see potential_matrix.
+    """
+    hamiltonian = potential_matrix(V, ISW, rule=rule, block_size=block_size,
+                                   kernel=kernel, method=method, dtype=dtype,
+                                   states=states)
+    eigenvals = ISW.eigenvals if states is None else ISW.eigenvals[states]
+    hamiltonian[np.diag_indices(len(hamiltonian))] += eigenvals
+    return hamiltonian
+
+
+def potential_matrix(V, ISW, rule="mean", block_size=64, kernel=None,
+                     method="quadrature", dtype=float, states=None):
+    """Compute the matrix elements <m|V|n> of the potential alone.
+
+    Each block of rows is a single matrix product of the weighted basis with
+    the basis functions at or right of the diagonal, so only the upper
+    triangle is computed and then mirrored into the lower one.
+
+    If the potential provides an exact kernel(m, n) for <m|V|n>, V is not
+    integrated on the grid at all. method="transform" uses
+    transform_matrix instead of quadrature, ignoring rule.
+
+    When ISW.block_size is set, e.g. for a memory-mapped basis, the basis
+    is read ISW.block_size grid points at a time and the products of the
+    blocks are summed, so the whole basis is never in memory at once.
+
+    The products are computed and the matrix returned in dtype, float32
+    halving the memory traffic of quadrature over a float32 basis.
+
+    states, 0-based indices into the basis, limits the matrix to
+    <states|V|states>, e.g. one parity of a symmetric potential.
+    """
+    assert(isinstance(ISW, InfiniteSquareWell))
+    if states is None:
+        states = np.arange(ISW.energy_eigenvals)
+    with stage("assembly", size=len(states), points=ISW.steps+1,
+               path="kernel" if kernel is not None else method):
+        return _assemble(V, ISW, rule, block_size, kernel, method, dtype,
+                         np.asarray(states))
+
+
+def _assemble(V, ISW, rule, block_size, kernel, method, dtype, states):
+    """Compute <m|V|n> as described in potential_matrix."""
+    if kernel is not None:
+        n = states + 1
+        return np.array(kernel(n[:, None], n[None, :]), dtype=dtype)
+    if method == "transform":
+        return transform_matrix(V, ISW, states).astype(dtype, copy=False)
+    if method != "quadrature":
+        raise ValueError("unknown method '{}', expected one of {}".format(
+            method, METHODS))
+
+    weights = (quadrature_weights(ISW, rule) * np.asarray(V)).astype(dtype)
+    every = len(states) == ISW.energy_eigenvals
+    n = len(states)
+    matrix = np.zeros((n, n), dtype=dtype)
+    if ISW.block_size is None:
+        basis = ISW.basis_funcs if every else ISW.basis_funcs[states]
+        basis = np.asarray(basis, dtype=dtype)
+        _add_upper_products(matrix, basis * weights, basis, block_size)
+    else:
+        for start in range(0, ISW.steps + 1, ISW.block_size):
+            cols = slice(start, start + ISW.block_size)
+            basis = ISW.basis_funcs[:, cols]
+            basis = np.array(basis if every else basis[states], dtype=dtype)
+            _add_upper_products(matrix, basis * weights[cols], basis,
+                                block_size)
+
+    # mirror the upper triangle into the lower one
+    upper = np.triu(matrix)
+    return upper + np.triu(upper, 1).T
+
+
+def _add_upper_products(matrix, weighted, basis, block_size):
+    """Add weighted @ basis.T to matrix, on and above the diagonal only."""
+    n = len(basis)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        matrix[start:stop, start:] += weighted[start:stop] @ basis[start:].T
+
+
+def transform_hamiltonian(V, ISW):
+    """Compute the hamiltonian with its potential from transform_matrix."""
+    return compute_hamiltonian(V, ISW, method="transform")
+
+
+def transform_matrix(V, ISW, states=None):
+    """Compute <m|V|n> from a single cosine transform of V.
+
+    With u = x - well_min, <m|V|n> = (C[|m-n|] - C[m+n]) / L where C[k] is
+    the integral of V(u) cos(k pi u / L), so one DCT-I of the samples fills
+    the whole matrix in O(steps log steps + N^2). The result is identical
+    to the trapezoid rule on the same grid. states limits it as in
+    potential_matrix.
+    """
+    assert(isinstance(ISW, InfiniteSquareWell))
+    C = _cosine_coefficients(V, ISW, 2 * ISW.energy_eigenvals)
+    if states is None:
+        states = np.arange(ISW.energy_eigenvals)
+    states = np.asarray(states) + 1
+    m, n = states[:, None], states[None, :]
+    return (C[np.abs(m - n)] - C[m + n]) / ISW.well_width
+
+
+def potential_block(V, ISW, rows, cols, rule="mean", kernel=None,
+                    method="quadrature"):
+    """Compute the rectangular block <rows|V|cols> of the potential matrix.
+
+    rows and cols index the basis from 0. The block is computed the same
+    way potential_matrix would, without the rest of the matrix.
+    """
+    assert(isinstance(ISW, InfiniteSquareWell))
+    rows, cols = np.asarray(rows), np.asarray(cols)
+    m, n = rows[:, None] + 1, cols[None, :] + 1
+    if kernel is not None:
+        return np.array(kernel(m, n), dtype=float)
+    if method == "transform":
+        C = _cosine_coefficients(V, ISW, int(m.max() + n.max()))
+        return (C[np.abs(m - n)] - C[m + n]) / ISW.well_width
+    if method != "quadrature":
+        raise ValueError("unknown method '{}', expected one of {}".format(
+            method, METHODS))
+
+    weights = quadrature_weights(ISW, rule) * np.asarray(V)
+    basis = ISW.basis_funcs
+    return (basis[rows] * weights) @ basis[cols].T
+
+
+def extend_potential_matrix(matrix, V, ISW, rule="mean", kernel=None,
+                            method="quadrature"):
+    """Grow a potential matrix to ISW.energy_eigenvals states.
+
+    matrix holds <m|V|n> for the first len(matrix) states. Only the new
+    rows and columns are computed.
+    """
+    old = len(matrix)
+    size = ISW.energy_eigenvals
+    new = np.arange(old, size)
+    block = potential_block(V, ISW, np.arange(size), new, rule=rule,
+                            kernel=kernel, method=method)
+
+    grown = np.empty((size, size))
+    grown[:old, :old] = matrix
+    grown[:, old:] = block
+    grown[old:, :old] = block[:old].T
+    return grown
+
+
+def _cosine_coefficients(V, ISW, kmax):
+    """C[k], k = 0..kmax, the trapezoid integral of V(u) cos(k pi u / L)."""
+    samples = np.array(V, dtype=float)
+    # endpoint values cancel exactly in C[|m-n|] - C[m+n], drop the walls
+    samples[[0, -1]] = 0.0
+
+    # DCT-I through the real FFT of the even extension of the samples
+    steps = ISW.steps
+    extended = np.concatenate((samples, samples[-2:0:-1]))
+    C = 0.5 * ISW.step_size * np.fft.rfft(extended).real
+
+    # frequencies above steps alias back onto the grid, C[k] = C[2 steps - k]
+    k = np.arange(kmax + 1) % (2 * steps)
+    return C[np.where(k > steps, 2 * steps - k, k)]
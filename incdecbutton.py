@@ -1,4 +1,5 @@
 """Create blank class to hold functions attached to buttons in main."""
+import numpy as np
 
 
 class IncDecButton:
@@ -10,19 +11,59 @@ class IncDecButton:
         self.subfig = subfig                # where to we put it
         self.canvas = canvas                # ditto
         self.x = x                          # same x vals
-        self.funcs = funcs                  # library of functions
+        self.funcs = funcs                  # Solution, indexed like a list
         self.potential = V                  # potential
         self.energy_eigenvals = len(funcs)  # set in main
         self.calc_extrema()                 # x and y limits
 
-    # plot the function func, clearing previous plot and resetting limits
+        # persistent artists, redrawn by blitting over a saved background
+        self.line, = subfig.plot([], [], animated=True)
+        self.potential_line, = subfig.plot([], [], animated=True,
+                                           visible=False)
+        self.background = None
+        canvas.mpl_connect("draw_event", self._on_draw)
+        self.animation = None               # after id of the next frame
+
+    # plot the function func in place of the previous one
     def replot(self, func):
-        """Clear the plot and plot func in its place."""
-        self.subfig.clear()
-        self.subfig.set_xlim(self.x_min, self.x_max)
-        self.subfig.set_ylim(-self.max_val, self.max_val)
-        self.subfig.plot(self.x, func)
-        self.canvas.draw()
+        """Show func in place of the current plot."""
+        self.stop_animation()
+        self.potential_line.set_visible(False)
+        self.line.set_data(self.x, func)
+        self._blit()
+
+    def animate(self, frames, interval_ms=33):
+        """Play frames, (t, psi) pairs as from Propagator.frames, as |psi|.
+
+        Frames are pulled from the iterable one at a time, so an endless
+        generator plays until stop_animation or another plot replaces it.
+        """
+        self.stop_animation()
+        self.potential_line.set_visible(False)
+        widget = self.canvas.get_tk_widget()
+
+        def step():
+            frame = next(frames, None)
+            if frame is None:
+                self.animation = None
+                return
+            density = np.abs(frame[1])
+            self.line.set_data(self.x, density)
+            if np.max(density) > self.max_val:
+                self.max_val = 1.25 * np.max(density)
+                self.set_limits()
+            else:
+                self._blit()
+            self.animation = widget.after(interval_ms, step)
+
+        frames = iter(frames)
+        step()
+
+    def stop_animation(self):
+        """Stop a running animation, leaving its last frame shown."""
+        if self.animation is not None:
+            self.canvas.get_tk_widget().after_cancel(self.animation)
+            self.animation = None
 
     def inc_selector(self):
         """Show 'next' plot, loop to beginning at the end."""
@@ -44,25 +85,73 @@ class IncDecButton:
 
     def plot_potential(self):
         """Show potential on top of current plot."""
-        self.subfig.set_xlim(self.x_min, self.x_max)
-        self.subfig.set_ylim(-self.max_val, self.max_val)
-        self.subfig.plot(self.x, self.potential)
-        self.canvas.draw()
+        self.potential_line.set_data(self.x, self.potential)
+        self.potential_line.set_visible(True)
+        self._blit()
 
     def init_plot(self):
         """Show first plot in the sequence, ignore value of selector."""
-        self.replot(self.funcs[0])
+        self.selector = 0
+        self.stop_animation()
+        self.line.set_data(self.x, self.funcs[0])
+        self.potential_line.set_visible(False)
+        self.set_limits()
 
     def calc_extrema(self):
         """Calculate and recalculate maxes."""
-        self.max_val = max(map(max, map(abs, self.funcs)))+0.1  # y limits
-        self.x_max = max(self.x)                       # Determined in ISW
-        self.x_min = min(self.x)                       # Determined in ISW
+        self.max_val = self.funcs.max_abs()+0.1        # y limits
+        self.x_max = float(np.max(self.x))             # Determined in ISW
+        self.x_min = float(np.min(self.x))             # Determined in ISW
+
+    def set_limits(self):
+        """Apply the limits and redraw everything, background included."""
+        self.subfig.set_xlim(self.x_min, self.x_max)
+        self.subfig.set_ylim(-self.max_val, self.max_val)
+        self.canvas.draw()
+
+    def update_vals(self, x, funcs, V, redraw=True):
+        """Set values of x, funcs, V and recalculate maxes.
 
-    def update_vals(self, x, funcs, V):
-        """Set values of x, funcs, V and recalculate maxes."""
+        With redraw False, e.g. while an amplitude slider moves, the shown
+        state is kept and only blitted, unless the axes have to grow.
+        """
+        self.stop_animation()
+        old_limits = (self.x_min, self.x_max, self.max_val)
         self.x = x
         self.funcs = funcs
         self.potential = V
         self.calc_extrema()
-        self.init_plot()
+        if redraw:
+            self.init_plot()
+            return
+
+        self.selector = min(self.selector, len(funcs)-1)
+        self.line.set_data(self.x, self.funcs[self.selector])
+        if self.potential_line.get_visible():
+            self.potential_line.set_data(self.x, self.potential)
+        if (self.x_min, self.x_max) != old_limits[:2] or \
+                self.max_val > old_limits[2]:
+            self.max_val *= 1.25  # headroom, so growing rarely redraws
+            self.set_limits()
+        else:
+            self.max_val = old_limits[2]  # don't let the axes jitter
+            self._blit()
+
+    def _blit(self):
+        """Redraw only the lines over the saved background."""
+        if self.background is None:
+            self.canvas.draw()  # the draw event saves the background
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_lines()
+        self.canvas.blit(self.subfig.bbox)
+
+    def _on_draw(self, event):
+        """After a full draw, save the background and draw the lines."""
+        self.background = self.canvas.copy_from_bbox(self.subfig.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        """Draw the animated artists onto the canvas."""
+        self.subfig.draw_artist(self.line)
+        self.subfig.draw_artist(self.potential_line)
@@ -1,10 +1,26 @@
 """Define an infinite square well basis object for the eigenfunctions."""
+import os
+from collections import OrderedDict
+
 import numpy as np
-import matplotlib.pyplot as plt
+
+from instrumentation import stage, count
+
+# number of distinct grids whose basis is kept around
+BASIS_CACHE_SIZE = 8
+
+# (well_min, well_max, steps, hbar, mass, dtype) -> BasisSet, least
+# recent first
+_basis_cache = OrderedDict()
+
+# grid points per block when the basis lives in a file
+DEFAULT_BLOCK_SIZE = 65536
 
 
 def main():
     """Test if the correct basis functions are generated."""
+    import matplotlib.pyplot as plt
+
     # tests if you can generate a ISW object, plots basis
     ISW = InfiniteSquareWell()
     for func in ISW.basis_funcs:
@@ -12,12 +28,135 @@ def main():
     plt.show()
 
 
+class BasisSet:
+    """Sine basis sampled on a grid, one contiguous row per eigenfunction."""
+
+    __slots__ = ("xvals", "funcs", "eigenvals")
+
+    def __init__(self, xvals, funcs, eigenvals):
+        """Store read-only arrays so cached copies can be shared safely."""
+        for arr in (xvals, funcs, eigenvals):
+            arr.setflags(write=False)
+        self.xvals = xvals
+        self.funcs = funcs
+        self.eigenvals = eigenvals
+
+    def __len__(self):
+        """Return the number of basis functions held."""
+        return len(self.funcs)
+
+
+def get_basis(well_min, well_max, steps, energy_eigenvals, hbar, mass,
+              dtype=float):
+    """Return a BasisSet with at least energy_eigenvals functions.
+
+    Bases are cached per grid, constants and dtype of the functions. Asking
+    for more functions than are cached only computes the missing ones.
+    """
+    key = (well_min, well_max, steps, hbar, mass, np.dtype(dtype).str)
+    basis = _basis_cache.pop(key, None)
+    count("basis_cache", basis is not None and
+          len(basis) >= energy_eigenvals)
+    if basis is None:
+        xvals = np.linspace(well_min, well_max, steps+1)
+        basis = _generate_basis(xvals, 1, energy_eigenvals, hbar, mass,
+                                dtype)
+    elif len(basis) < energy_eigenvals:
+        extra = _generate_basis(basis.xvals, len(basis)+1, energy_eigenvals,
+                                hbar, mass, dtype)
+        basis = BasisSet(basis.xvals,
+                         np.concatenate((basis.funcs, extra.funcs)),
+                         np.concatenate((basis.eigenvals, extra.eigenvals)))
+
+    _basis_cache[key] = basis
+    while len(_basis_cache) > BASIS_CACHE_SIZE:
+        _basis_cache.popitem(last=False)
+    return basis
+
+
+def install_basis(well_min, well_max, steps, hbar, mass, funcs):
+    """Put precomputed basis functions, e.g. from shared memory, in the cache.
+
+    funcs holds rows 1..len(funcs) of the basis on the same grid get_basis
+    would produce. It is used as is, without copying.
+    """
+    xvals = np.linspace(well_min, well_max, steps+1)
+    n = np.arange(1, len(funcs)+1, dtype=float)
+    L = abs(well_max - well_min)
+    eigenvals = (n * hbar * np.pi / L) ** 2 / (2.0*mass)
+
+    key = (well_min, well_max, steps, hbar, mass, funcs.dtype.str)
+    _basis_cache[key] = BasisSet(xvals, funcs, eigenvals)
+    while len(_basis_cache) > BASIS_CACHE_SIZE:
+        _basis_cache.popitem(last=False)
+
+
+def memmap_basis(well_min, well_max, steps, energy_eigenvals, hbar, mass,
+                 directory, block_size=DEFAULT_BLOCK_SIZE, dtype=float):
+    """Return a BasisSet whose functions live in a file in directory.
+
+    The file is filled block_size grid points at a time, so memory use is
+    bounded by energy_eigenvals * block_size rather than the whole basis.
+    An existing file for the same grid and size is reused.
+    """
+    xvals = np.linspace(well_min, well_max, steps+1)
+    L = abs(well_max - well_min)
+    n = np.arange(1, energy_eigenvals+1, dtype=float)
+    eigenvals = (n * hbar * np.pi / L) ** 2 / (2.0*mass)
+
+    name = "basis_{!r}_{!r}_{}_{}_{!r}_{!r}_{}.dat".format(
+        well_min, well_max, steps, energy_eigenvals, hbar, mass,
+        np.dtype(dtype).name)
+    path = os.path.join(directory, name)
+    shape = (energy_eigenvals, steps+1)
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        partial = path + ".{}.tmp".format(os.getpid())
+        funcs = np.memmap(partial, dtype=dtype, mode="w+", shape=shape)
+        for start in range(0, steps+1, block_size):
+            block = xvals[start:start+block_size]
+            funcs[:, start:start+block_size] = np.sqrt(2/L)*np.sin(
+                np.outer(n, np.pi*(block-well_min)/L))
+        funcs.flush()
+        del funcs
+        os.replace(partial, path)
+
+    funcs = np.memmap(path, dtype=dtype, mode="r", shape=shape)
+    return BasisSet(xvals, funcs, eigenvals)
+
+
+def clear_basis_cache():
+    """Forget every cached basis."""
+    _basis_cache.clear()
+
+
+def _generate_basis(xvals, first, last, hbar, mass, dtype=float):
+    """Compute eigenfunctions first..last of the well spanned by xvals."""
+    # Quick pneumonics
+    PI = np.pi
+    L = abs(xvals[-1] - xvals[0])
+
+    # ISW eigenvalues are natural numbers, one row per n
+    n = np.arange(first, last+1, dtype=float)
+    eigenvals = (n * hbar * PI / L) ** 2 / (2.0*mass)
+    funcs = np.sqrt(2/L)*np.sin(np.outer(n, PI*(xvals-xvals[0])/L))
+    return BasisSet(xvals, np.ascontiguousarray(funcs, dtype=dtype),
+                    eigenvals)
+
+
 class InfiniteSquareWell:
     """Class which contains all important information about the ISW."""
 
     def __init__(self, well_min=0.0, well_max=1.0, steps=200,
-                 energy_eigenvals=5, hbar=1.0, mass=1.0):
-        """Initialize given width, mass, number of evals and resolution."""
+                 energy_eigenvals=5, hbar=1.0, mass=1.0, storage=None,
+                 block_size=None, dtype=float):
+        """Initialize given width, mass, number of evals and resolution.
+
+        With a storage directory the basis is kept in a memory-mapped file
+        there, and assembly and reconstruction stream over block_size grid
+        points at a time. dtype is that of the basis functions and of the
+        potentials sampled on this well.
+        """
         # values set by user
         self.well_min = well_min
         self.well_max = well_max
@@ -26,15 +165,24 @@ class InfiniteSquareWell:
         self.energy_eigenvals = energy_eigenvals
         self.step_size = self.well_width / steps
 
-        # used in generation
-        self.basis_funcs = []
-        self.eigenvals = []
-        self.xvals = []
+        # used in generation, filled from the shared basis cache
+        self.basis_funcs = None
+        self.eigenvals = None
+        self.xvals = None
 
         # Set to 1 because we can
         self.hbar = hbar
         self.mass = mass
 
+        # precision of the sampled functions, see precision.DtypePolicy
+        self.dtype = np.dtype(dtype)
+
+        # out-of-core mode
+        self.storage = storage
+        self.block_size = block_size
+        if storage is not None and block_size is None:
+            self.block_size = DEFAULT_BLOCK_SIZE
+
         # do everything in initializer
         self.generate_basis_funcs()
 
@@ -42,25 +190,22 @@ class InfiniteSquareWell:
         """Generate eigenfunctions of zero potential well."""
         # know how to generate the infinite square well basis,
         # can base everything off that
-
-        # Quick pneumonics
-        PI = np.pi
-        L = self.well_width
+        with stage("basis", size=self.energy_eigenvals, points=self.steps+1,
+                   storage=self.storage):
+            if self.storage is not None:
+                basis = memmap_basis(self.well_min, self.well_max,
+                                     self.steps, self.energy_eigenvals,
+                                     self.hbar, self.mass, self.storage,
+                                     self.block_size, self.dtype)
+            else:
+                basis = get_basis(self.well_min, self.well_max, self.steps,
+                                  self.energy_eigenvals, self.hbar,
+                                  self.mass, self.dtype)
 
         # all wavefunction values are in the same box
-        self.xvals = np.linspace(self.well_min, self.well_max, self.steps+1)
-        # ISW eigenvalues are natural numbers
-        for n in range(1, self.energy_eigenvals+1):
-            # analytic formulae
-            energy = (n * self.hbar * PI / L) ** 2 / (2.0*self.mass)
-
-            eigenfunc = []
-            for x in self.xvals:
-                eigenfunc.append(np.sqrt(2/L)*np.sin(n*PI*(x-self.well_min)/L))
-
-            # Add to lists
-            self.eigenvals.append(energy)
-            self.basis_funcs.append(eigenfunc)
+        self.xvals = basis.xvals
+        self.basis_funcs = basis.funcs[:self.energy_eigenvals]
+        self.eigenvals = basis.eigenvals[:self.energy_eigenvals]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,182 @@
+"""Opt-in timing of the solve pipeline through observer callbacks.
+
+Instrumented code wraps its stages in stage(name, ...) and reports cache
+lookups with count(name, hit). Both do nothing unless an observer is
+registered, so instrumentation costs one list check when nobody listens.
+An observer is called with one event dict per finished stage or count:
+
+    - name, kind ("stage" or "count"), thread, start in perf_counter
+      seconds, info with the keyword arguments of the call
+    - stages also have duration in seconds and allocations, the change in
+      the number of allocated memory blocks over the stage
+
+collect() gathers every event into a Report, which summarizes them and
+writes Chrome trace JSON for chrome://tracing or https://ui.perfetto.dev.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+
+# callbacks receiving every event, instrumentation is off while empty
+_observers = []
+
+# returned by stage while disabled
+_NULL_STAGE = nullcontext()
+
+
+def add_observer(callback):
+    """Call callback(event) for every event from now on."""
+    _observers.append(callback)
+
+
+def remove_observer(callback):
+    """Stop calling callback."""
+    _observers.remove(callback)
+
+
+def enabled():
+    """Return whether anybody is listening."""
+    return bool(_observers)
+
+
+def stage(name, **info):
+    """Context manager timing one stage, info is passed on to observers."""
+    if not _observers:
+        return _NULL_STAGE
+    return _Stage(name, info)
+
+
+def count(name, hit, **info):
+    """Report one lookup of cache name, a hit or a miss."""
+    if _observers:
+        _emit({"name": name, "kind": "count", "start": time.perf_counter(),
+               "thread": threading.get_ident(),
+               "info": dict(info, hit=bool(hit))})
+
+
+@contextmanager
+def collect():
+    """Gather the events of the enclosed block into a Report.
+
+        with collect() as report:
+            solve("hydrogen", 1.0)
+        print(report.summary())
+    """
+    report = Report()
+    add_observer(report.events.append)
+    try:
+        yield report
+    finally:
+        remove_observer(report.events.append)
+
+
+def _emit(event):
+    """Pass event to every observer."""
+    for callback in list(_observers):
+        callback(event)
+
+
+class _Stage:
+    """Time a stage and count the memory blocks allocated during it."""
+
+    __slots__ = ("name", "info", "start", "blocks")
+
+    def __init__(self, name, info):
+        """Remember what to report."""
+        self.name = name
+        self.info = info
+
+    def __enter__(self):
+        """Start the clock."""
+        self.blocks = sys.getallocatedblocks()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        """Report the stage, also when it raised."""
+        duration = time.perf_counter() - self.start
+        _emit({"name": self.name, "kind": "stage", "start": self.start,
+               "duration": duration, "thread": threading.get_ident(),
+               "allocations": sys.getallocatedblocks() - self.blocks,
+               "info": self.info})
+
+
+class Report:
+    """Events gathered by collect()."""
+
+    def __init__(self):
+        """Start empty."""
+        self.events = []
+
+    def stages(self):
+        """Return {name: dict(calls, total, mean, max, allocations)}."""
+        stats = OrderedDict()
+        for event in self.events:
+            if event["kind"] != "stage":
+                continue
+            entry = stats.setdefault(event["name"], dict(
+                calls=0, total=0.0, max=0.0, allocations=0))
+            entry["calls"] += 1
+            entry["total"] += event["duration"]
+            entry["max"] = max(entry["max"], event["duration"])
+            entry["allocations"] += event["allocations"]
+        for entry in stats.values():
+            entry["mean"] = entry["total"] / entry["calls"]
+        return stats
+
+    def hit_rates(self):
+        """Return {cache name: (hits, lookups, hit rate)}."""
+        counts = OrderedDict()
+        for event in self.events:
+            if event["kind"] == "count":
+                hits, lookups = counts.get(event["name"], (0, 0))
+                counts[event["name"]] = (hits + event["info"]["hit"],
+                                         lookups + 1)
+        return OrderedDict((name, (hits, lookups, hits / lookups))
+                           for (name, (hits, lookups)) in counts.items())
+
+    def summary(self):
+        """Return a table of the stages and cache hit rates as text."""
+        lines = ["{:<20} {:>7} {:>12} {:>12} {:>12} {:>12}".format(
+            "stage", "calls", "total [s]", "mean [s]", "max [s]", "blocks")]
+        for (name, entry) in self.stages().items():
+            lines.append("{:<20} {:>7} {:>12.6f} {:>12.6f} {:>12.6f} "
+                         "{:>12}".format(name, entry["calls"], entry["total"],
+                                         entry["mean"], entry["max"],
+                                         entry["allocations"]))
+        for (name, (hits, lookups, rate)) in self.hit_rates().items():
+            lines.append("{:<20} {:>7} lookups, {:.1%} hits".format(
+                name, lookups, rate))
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        """Return the events in the Chrome trace event format."""
+        pid = os.getpid()
+        trace = []
+        for event in self.events:
+            entry = {"name": event["name"], "cat": event["kind"],
+                     "ts": event["start"] * 1e6, "pid": pid,
+                     "tid": event["thread"], "args": _jsonable(event["info"])}
+            if event["kind"] == "stage":
+                entry.update(ph="X", dur=event["duration"] * 1e6)
+                entry["args"]["allocations"] = event["allocations"]
+            else:
+                entry.update(ph="i", s="t")
+            trace.append(entry)
+        return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path):
+        """Write chrome_trace() as JSON to path."""
+        with open(path, "w") as out:
+            json.dump(self.chrome_trace(), out)
+
+
+def _jsonable(info):
+    """Copy info with values JSON can't take turned into strings."""
+    return {key: value if isinstance(value, (bool, int, float, str,
+                                             type(None))) else str(value)
+            for (key, value) in info.items()}
@@ -1,73 +1,70 @@
 """Solve the particle in a box problem via diagonalization."""
 # libraries
-import numpy as np
-import numpy.linalg as la
-import tkinter
-
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.backends.backend_tkagg import NavigationToolbar2Tk
-from matplotlib.figure import Figure
+import os
+from itertools import count
 
 # files
-from potentials import PotentialType
+from potentials import PotentialType, registered_potentials
+from potentials import potential_label
 from incdecbutton import IncDecButton
-from infinitesquarewell import InfiniteSquareWell
-from generatehamiltonian import compute_hamiltonian
+from solver import solve
+from backgroundsolver import BackgroundSolver
+from amplitudeslider import AmplitudeSlider
+from solutioncache import SolutionCache
+from timeevolution import Propagator, gaussian_packet
+
+# set to a directory to keep solutions across restarts of the GUI
+CACHE_DIR_VARIABLE = "SCHRODINGER_CACHE_DIR"
+
+# states followed by the amplitude slider when "States Shown" is blank
+SLIDER_STATES = 10
 
 
 def solve_problem(text_obj, potential_choice, potential_amplitude,
-                  e_vals=10, l_bnd=-5.0, r_bnd=5.0):
+                  e_vals=10, l_bnd=-5.0, r_bnd=5.0, k=None, method="auto",
+                  analytic=True, assembly="quadrature", engine="spectral"):
     """Solve the particle in a box problem given the following.
 
-    - Potential Form
+    - Potential Form, a PotentialType or registered name
     - Potential Amplitude
     - Well Width
     - Number of e-vals
-    """
-    # get infinite square well basis
-    ISW = InfiniteSquareWell(energy_eigenvals=e_vals,
-                             well_min=l_bnd, well_max=r_bnd)
-    # choose potential
-    potential = potential_choice
-    V = potential.get_potential(ISW, potential_amplitude)
-
-    # compute hamiltonian matrix from the potential
-    H = compute_hamiltonian(V, ISW)
+    - Number of lowest states k to keep, all of them if None
+    - Eigensolver method, see eigensolvers.SOLVERS
+    - Whether to use exact matrix elements when the potential has them
+    - Assembly method otherwise, see generatehamiltonian.METHODS
+    - Engine, the ISW basis or finite differences, see solver.ENGINES
 
-    # diagonalize hamiltonian, getting eigenvals and eigenvecs
-    vals, vecs = la.eig(H)
-
-    # new functions are the eigenvectors time the eigenfunctions of ISW
-    newfuncs = []
-    for col in np.transpose(vecs):
-        lin_combination = np.zeros(len(ISW.basis_funcs[0]))
-        for (i, val) in enumerate(col):
-            lin_combination += np.multiply(ISW.basis_funcs[i], val)
-        newfuncs.append(lin_combination)
-
-    x = ISW.xvals
-
-    # sort by eigenval
-    zipped = zip(vals, newfuncs)
-    sorted_zip = sorted(zipped)
-    sorted_newfuncs = [func for _, func in sorted_zip]
+    The energies are written into text_obj, use solver.solve headless.
+    """
+    solution = solve(potential_choice, potential_amplitude, e_vals=e_vals,
+                     l_bnd=l_bnd, r_bnd=r_bnd, k=k, method=method,
+                     analytic=analytic, assembly=assembly, engine=engine)
 
-    _format_energy_text(text_obj, vals)
+    _format_energy_text(text_obj, solution.energies)
 
-    return (x, sorted_newfuncs, V, vals)
+    # the solution builds each eigenstate only when it is plotted
+    return (solution.xvals, solution, solution.potential, solution.energies)
 
 
 def main():
     """Run the main loop of the program, handle events, etc."""
     global canvas, root
 
+    # GUI libraries are only needed by the front-end
+    import tkinter
+    import tkinter.ttk
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from matplotlib.backends.backend_tkagg import NavigationToolbar2Tk
+    from matplotlib.figure import Figure
+
     # set up tkinter
     root = tkinter.Tk()
     root.geometry("1000x600")
     root.wm_title("1-D Schrodinger")
 
     # create list items & such
-    potentials = [potential.name for potential in PotentialType]
+    potentials = registered_potentials()
     list_items = tkinter.Variable(value=potentials)
     listbox = tkinter.Listbox(
         root,
@@ -135,6 +132,12 @@ def main():
         text="Plot Potential",
         command=lambda: inc_dec.plot_potential())
 
+    # let a wavepacket evolve in the current eigenstates
+    animate_button = tkinter.Button(
+        master=root,
+        text="Animate Packet",
+        command=lambda: _animate_packet(inc_dec))
+
     # change well minimum and maximum
     min_entry = tkinter.Entry(
         root, validate="key", validatecommand=(reg_f, '%P'))
@@ -149,11 +152,41 @@ def main():
         root, validate="key", validatecommand=(reg_i, '%P'))
     eig_entry.insert(tkinter.END, "10")
 
+    # number of lowest states to solve for, blank means all of them
+    states_entry = tkinter.Entry(
+        root, validate="key", validatecommand=(reg_i, '%P'))
+
+    # busy indicator while a solve runs in the background
+    busy_bar = tkinter.ttk.Progressbar(root, mode="indeterminate", length=120)
+
+    # flipping back to a previous configuration is answered from cache
+    cache = SolutionCache(directory=os.environ.get(CACHE_DIR_VARIABLE))
+
+    # solves run off the main thread, results come back through root.after
+    background = BackgroundSolver(
+        root,
+        lambda potential, solution: _on_solved(
+            inc_dec, e_text, fig, potential, solution),
+        on_busy=lambda busy: _set_busy(busy_bar, busy),
+        solve_func=cache.solve)
+
     # listbox to pick potential
     listbox.bind('<<ListboxSelect>>',
                  lambda x: _on_item_select(
-                     listbox, inc_dec, e_text, amp_text,
-                     fig, min_entry, max_entry, eig_entry, x))
+                     listbox, background, amp_text,
+                     min_entry, max_entry, eig_entry, states_entry, x))
+
+    # amplitude slider, solved at most once per frame while it moves
+    slider = AmplitudeSlider(
+        root,
+        lambda potential, solution: _on_slid(inc_dec, e_text, solution),
+        background)
+    amp_scale = tkinter.Scale(
+        root, from_=-50.0, to=50.0, resolution=0.1,
+        orient=tkinter.HORIZONTAL, showvalue=False, length=150,
+        command=lambda value: _on_amp_slide(
+            listbox, slider, amp_text,
+            min_entry, max_entry, eig_entry, states_entry, value))
 
     # labels
     eng_label_text = tkinter.StringVar(value="Energy Values:")
@@ -161,29 +194,37 @@ def main():
     min_label_text = tkinter.StringVar(value="Well Min:")
     max_label_text = tkinter.StringVar(value="Well Max:")
     eig_label_text = tkinter.StringVar(value="Energy Eigenvals:")
+    states_label_text = tkinter.StringVar(value="States Shown:")
     energy_label = tkinter.Label(root, textvariable=eng_label_text, height=2)
     pot_label = tkinter.Label(root, textvariable=pot_label_text, height=2)
     min_label = tkinter.Label(root, textvariable=min_label_text, height=2)
     max_label = tkinter.Label(root, textvariable=max_label_text, height=2)
     eig_label = tkinter.Label(root, textvariable=eig_label_text, height=2)
+    states_label = tkinter.Label(
+        root, textvariable=states_label_text, height=2)
 
     # pack buttons
     canvas.get_tk_widget().pack(side=tkinter.LEFT, fill=tkinter.BOTH, expand=1)
     prev_button.pack(side=tkinter.TOP)
     next_button.pack(side=tkinter.TOP)
     potential_button.pack(side=tkinter.TOP)
+    animate_button.pack(side=tkinter.TOP)
     pot_label.pack(side=tkinter.TOP)
     listbox.pack(side=tkinter.TOP)
     eig_label.pack(side=tkinter.TOP)
     eig_entry.pack(side=tkinter.TOP)
+    states_label.pack(side=tkinter.TOP)
+    states_entry.pack(side=tkinter.TOP)
     amp_label.pack(side=tkinter.TOP)
     amp_text.pack(side=tkinter.TOP)
+    amp_scale.pack(side=tkinter.TOP)
     min_label.pack(side=tkinter.TOP)
     min_entry.pack(side=tkinter.TOP)
     max_label.pack(side=tkinter.TOP)
     max_entry.pack(side=tkinter.TOP)
     energy_label.pack(side=tkinter.TOP)
     e_text.pack(side=tkinter.TOP)
+    busy_bar.pack(side=tkinter.TOP)
     quit_button.pack(side=tkinter.BOTTOM)
 
     tkinter.mainloop()
@@ -194,11 +235,11 @@ def _format_energy_text(text_obj, energy_vals):
     text_obj.delete("1.0", "end")
 
     energy_string = ""
-    for (i, val) in enumerate(np.sort(energy_vals)):
+    for (i, val) in enumerate(energy_vals):
         num = "0{}".format(i+1) if i+1 < 10 else str(i+1)
         energy_string += "E_{} = {:.2f}\n".format(num, val)
 
-    text_obj.insert(tkinter.END, energy_string)
+    text_obj.insert("end", energy_string)
 
 
 def _validate_float(test):
@@ -217,30 +258,82 @@ def _validate_int(test):
     return (test.isdigit() or test == "")
 
 
-def _on_item_select(list_box, button_obj, e_text_obj, amp_text_obj,
-                    fig, min_text_obj, max_text_obj, e_val_obj, event):
-    """When an item in list_box is selected, recalculate the problem."""
-    # global canvas, root
-
-    potential = [enum for enum in PotentialType][list_box.curselection()[0]]
-    potential_amp = float(amp_text_obj.get())
+def _read_settings(list_box, min_text_obj, max_text_obj, e_val_obj,
+                   states_obj):
+    """Return the selected potential and the solve settings in the form."""
+    potential = registered_potentials()[list_box.curselection()[0]]
     well_min = float(min_text_obj.get())
     well_max = float(max_text_obj.get())
     e_vals = int(e_val_obj.get())
+    states = int(states_obj.get()) if states_obj.get() else None
+    return potential, dict(e_vals=e_vals, l_bnd=well_min, r_bnd=well_max,
+                           k=states)
+
+
+def _on_item_select(list_box, background, amp_text_obj,
+                    min_text_obj, max_text_obj, e_val_obj, states_obj, event):
+    """When an item in list_box is selected, recalculate the problem."""
+    potential, settings = _read_settings(
+        list_box, min_text_obj, max_text_obj, e_val_obj, states_obj)
+    potential_amp = float(amp_text_obj.get())
+
+    # solve the problem... again, without blocking the window
+    background.submit(potential, potential_amp, **settings)
+
 
-    # solve the problem... again
-    x, funcs, V, vals = solve_problem(
-        e_text_obj, potential, potential_amp,
-        e_vals=e_vals, l_bnd=well_min, r_bnd=well_max)
+def _on_amp_slide(list_box, slider, amp_text_obj, min_text_obj,
+                  max_text_obj, e_val_obj, states_obj, value):
+    """Follow the amplitude slider, keeping the amplitude field in sync."""
+    potential, settings = _read_settings(
+        list_box, min_text_obj, max_text_obj, e_val_obj, states_obj)
+    if settings["k"] is None:
+        # few states keep continuation cheap enough for every frame
+        settings["k"] = min(settings["e_vals"], SLIDER_STATES)
 
+    amp_text_obj.delete(0, "end")
+    amp_text_obj.insert(0, value)
+    slider.move(potential, float(value), **settings)
+
+
+def _on_slid(button_obj, e_text_obj, solution):
+    """Show a slider solution without redrawing the whole figure."""
+    button_obj.update_vals(solution.xvals, solution, solution.potential,
+                           redraw=False)
+    _format_energy_text(e_text_obj, solution.energies)
+
+
+def _on_solved(button_obj, e_text_obj, fig, potential, solution):
+    """Show a solution delivered by the background solver."""
     # update figure title
-    fig.suptitle(potential.to_string())
+    fig.suptitle(potential_label(potential))
 
     # update button class
-    button_obj.update_vals(x, funcs, V)
+    button_obj.update_vals(solution.xvals, solution, solution.potential)
 
     # update energy text
-    _format_energy_text(e_text_obj, vals)
+    _format_energy_text(e_text_obj, solution.energies)
+
+
+def _animate_packet(button_obj):
+    """Play a gaussian packet, released left of center, until replaced."""
+    solution = button_obj.funcs
+    x = solution.xvals
+    width = x[-1] - x[0]
+    packet = gaussian_packet(x, x[0] + width / 3.0, width / 20.0)
+
+    # a dozen frames per period of the fastest beat between states
+    spread = solution.energies[-1] - solution.energies[0]
+    dt = 0.5 / spread if spread > 0 else 1.0
+    frames = Propagator(solution, packet).frames(count(0.0, dt))
+    button_obj.animate(frames)
+
+
+def _set_busy(busy_bar, busy):
+    """Run the busy indicator while a solve is in flight."""
+    if busy:
+        busy_bar.start(20)
+    else:
+        busy_bar.stop()
 
 
 def _quit(root):
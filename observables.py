@@ -0,0 +1,132 @@
+"""Expectation values and matrix elements of x and p for every eigenstate.
+
+An operator is built once in the ISW basis, O[m, n] = <m|O|n>, and taken
+to the eigenbasis of a Solution as C^T O C with its (N, k) coefficients
+C, giving all k x k elements <i|O|j> in one product. The ISW elements are
+exact:
+
+    - x and x^2 from the piecewise polynomial kernel of potentials.py
+    - <m|p|n> = -i hbar 4mn / (L (m^2 - n^2)) when m + n is odd, else 0
+    - <m|p^2|n> = (n pi hbar / L)^2 when m = n, else 0
+
+Solutions from the finite difference engine have no basis; their
+elements are integrated on the grid, with p from finite differences.
+"""
+from collections import OrderedDict
+
+import numpy as np
+
+from potentials import bounds_kernel
+
+# operators understood by operator_matrix
+OPERATORS = ("x", "x2", "p", "p2")
+
+# number of wells whose operators are kept
+OPERATOR_CACHE_SIZE = 8
+
+# (well_min, well_max) -> {operator: (N, N) ISW basis matrix}
+_operator_cache = OrderedDict()
+
+
+def operator_matrix(solution, operator, hbar=1.0):
+    """Return <i|operator|j> between all eigenstates of solution, (k, k).
+
+    operator is one of OPERATORS. The p matrix is complex, the others real.
+    """
+    if operator not in OPERATORS:
+        raise ValueError("unknown operator '{}', expected one of {}".format(
+            operator, OPERATORS))
+    if solution.basis is None:
+        return _grid_matrix(solution, operator, hbar)
+
+    C = solution.eigenvectors
+    basis_matrix = basis_operators(solution.xvals[0], solution.xvals[-1],
+                                   len(C))[operator]
+    matrix = C.T @ basis_matrix @ C
+    if operator == "p":
+        return -1j * hbar * matrix
+    if operator == "p2":
+        return hbar * hbar * matrix
+    return matrix
+
+
+def expectation_values(solution, hbar=1.0):
+    """Return <x>, <x^2>, <p>, <p^2>, dx and dp of every state as arrays."""
+    values = {}
+    for operator in OPERATORS:
+        values[operator] = np.real(np.diagonal(
+            operator_matrix(solution, operator, hbar)))
+    values["dx"] = np.sqrt(np.maximum(values["x2"] - values["x"]**2, 0.0))
+    values["dp"] = np.sqrt(np.maximum(values["p2"] - values["p"]**2, 0.0))
+    return values
+
+
+def transition_dipoles(solution):
+    """Return the transition dipole matrix <i|x|j> of all states, (k, k)."""
+    return operator_matrix(solution, "x")
+
+
+def probability_densities(solution):
+    """Return |psi_i|^2 of every state on the grid, (k, steps+1)."""
+    return np.abs(solution.wavefunctions()) ** 2
+
+
+def basis_operators(well_min, well_max, size):
+    """Return {operator: <m|O|n> for m, n = 1..size} in the ISW basis.
+
+    p and p^2 are given in units of -i hbar and hbar^2. Operators are
+    cached per well and extended when more basis functions are needed.
+    """
+    key = (well_min, well_max)
+    cached = _operator_cache.pop(key, None)
+    if cached is None or len(cached["x"]) < size:
+        cached = _basis_operators(well_min, well_max, size)
+    _operator_cache[key] = cached
+    while len(_operator_cache) > OPERATOR_CACHE_SIZE:
+        _operator_cache.popitem(last=False)
+    return {operator: matrix[:size, :size]
+            for (operator, matrix) in cached.items()}
+
+
+def clear_operator_cache():
+    """Forget every cached operator."""
+    _operator_cache.clear()
+
+
+def _basis_operators(well_min, well_max, size):
+    """Compute the ISW basis operators of basis_operators."""
+    L = abs(well_max - well_min)
+    n = np.arange(1, size + 1)
+    m, n = n[:, None], n[None, :]
+
+    rows, cols = np.nonzero((m + n) % 2 == 1)
+    a, b = rows + 1.0, cols + 1.0
+    momentum = np.zeros((size, size))
+    momentum[rows, cols] = 4.0 * a * b / (L * (a*a - b*b))
+
+    def polynomial(coeffs):
+        """<m|c0 + c1 x + c2 x^2|n> over the whole well."""
+        pieces = [(well_min, well_max, coeffs)]
+        return bounds_kernel(well_min, well_max, pieces)(m, n)
+
+    return {"x": polynomial((0.0, 1.0, 0.0)),
+            "x2": polynomial((0.0, 0.0, 1.0)),
+            "p": momentum,
+            "p2": np.diag((np.arange(1, size + 1) * np.pi / L) ** 2)}
+
+
+def _grid_matrix(solution, operator, hbar):
+    """Integrate <i|operator|j> on the grid for states without a basis."""
+    x = solution.xvals
+    h = x[1] - x[0]
+    states = solution.wavefunctions()  # (k, steps+1), zero at the walls
+    if operator == "x":
+        return states * x @ states.T * h
+    if operator == "x2":
+        return states * x * x @ states.T * h
+    if operator == "p":
+        slopes = np.gradient(states, h, axis=1)
+        return -1j * hbar * states @ slopes.T * h
+    # <i|p^2|j> = hbar^2 <i'|j'> after integrating by parts
+    slopes = np.diff(states, axis=1) / h
+    return hbar * hbar * slopes @ slopes.T * h
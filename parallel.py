@@ -0,0 +1,169 @@
+"""Spread a sweep over worker processes."""
+import os
+import multiprocessing
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from sweep import SweepPoint, sweep
+from infinitesquarewell import get_basis, install_basis
+
+# environment variables read by the common BLAS builds at import time
+BLAS_THREAD_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                    "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS",
+                    "NUMEXPR_NUM_THREADS")
+
+# grids whose basis a SweepPool shares, later grids are left to the workers
+SHARED_GRIDS = 16
+
+# shared memory segments attached by this worker process, by name
+_attached = {}
+
+
+def parallel_sweep(points, processes=None, chunk_size=64, blas_threads=1,
+                   progress=None, steps=200, **sweep_kwargs):
+    """Solve points over a process pool, yielding SweepResults in order.
+
+    - processes: number of workers, os.cpu_count() if None
+    - chunk_size: points per task, keep runs of equal grids together
+    - blas_threads: BLAS threads per worker, so workers don't oversubscribe
+    - progress: called as progress(done, total) after every chunk
+    - sweep_kwargs: passed on to sweep.sweep
+
+    The basis of every grid is computed once here and handed to the
+    workers through shared memory instead of being pickled per task. To
+    solve several batches of points, keep a SweepPool instead.
+    """
+    with SweepPool(processes, blas_threads) as pool:
+        yield from pool.sweep(points, chunk_size, progress, steps,
+                              **sweep_kwargs)
+
+
+class SweepPool:
+    """A process pool and shared bases kept for any number of sweeps.
+
+    Starting the workers and sharing a basis happen once, not per sweep.
+    The pool is closed, and its shared memory freed, by close() or at the
+    end of a with block.
+    """
+
+    def __init__(self, processes=None, blas_threads=1):
+        """Start processes workers using blas_threads BLAS threads each."""
+        self.segments = []  # every segment created, unlinked by close
+        self.shared = {}    # (l_bnd, r_bnd, steps) -> descriptor
+        ctx = multiprocessing.get_context("spawn")
+        with _blas_threads(blas_threads):
+            self.pool = ctx.Pool(processes, initializer=_init_worker,
+                                 initargs=(blas_threads,))
+
+    def __enter__(self):
+        """Use the pool in a with block."""
+        return self
+
+    def __exit__(self, *exc):
+        """Close the pool."""
+        self.close()
+
+    def sweep(self, points, chunk_size=64, progress=None, steps=200,
+              **sweep_kwargs):
+        """Solve points on the pool, as parallel_sweep does."""
+        points = [SweepPoint(*point) for point in points]
+        kwargs = dict(sweep_kwargs, steps=steps)
+        tasks = []
+        for i in range(0, len(points), chunk_size):
+            chunk = points[i:i+chunk_size]
+            tasks.append((chunk, kwargs, self._share(chunk, steps)))
+
+        done = 0
+        for results in self.pool.imap(_solve_chunk, tasks):
+            done += len(results)
+            if progress is not None:
+                progress(done, len(points))
+            yield from results
+
+    def close(self):
+        """Stop the workers and free the shared bases."""
+        self.pool.terminate()
+        self.pool.join()
+        for segment in self.segments:
+            segment.close()
+            segment.unlink()
+        self.segments = []
+        self.shared = {}
+
+    def _share(self, chunk, steps):
+        """Return descriptors of the shared bases the grids of chunk use.
+
+        A grid's basis is copied into shared memory the first time it is
+        needed, and again only if a point needs more functions. Every
+        segment is recorded as soon as it exists, so close frees it even
+        if a later one fails.
+        """
+        sizes = {}
+        for point in chunk:
+            grid = (point.l_bnd, point.r_bnd, steps)
+            sizes[grid] = max(sizes.get(grid, 0), point.e_vals)
+
+        descriptors = []
+        for (grid, n) in sizes.items():
+            descriptor = self.shared.get(grid)
+            if descriptor is None and len(self.shared) >= SHARED_GRIDS:
+                continue  # the workers compute this basis themselves
+            if descriptor is None or descriptor[1][0] < n:
+                l_bnd, r_bnd = grid[:2]
+                funcs = get_basis(l_bnd, r_bnd, steps, n, 1.0, 1.0).funcs[:n]
+                segment = shared_memory.SharedMemory(create=True,
+                                                     size=funcs.nbytes)
+                self.segments.append(segment)
+                np.ndarray(funcs.shape, buffer=segment.buf)[:] = funcs
+                descriptor = (segment.name, funcs.shape,
+                              (l_bnd, r_bnd, steps, 1.0, 1.0))
+                self.shared[grid] = descriptor
+            descriptors.append(descriptor)
+        return descriptors
+
+
+def _init_worker(blas_threads):
+    """Limit the BLAS threads of a worker."""
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(blas_threads)
+    except ImportError:
+        pass  # the environment variables set by the parent apply
+
+
+def _attach(name):
+    """Attach to a segment, leaving its cleanup to the parent process."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # before python 3.13 workers register with the parent's resource
+        # tracker, which forgets the segment once the parent unlinks it
+        return shared_memory.SharedMemory(name=name)
+
+
+def _solve_chunk(task):
+    """Run one chunk of the sweep inside a worker."""
+    chunk, kwargs, descriptors = task
+    for (name, shape, grid) in descriptors:
+        if name not in _attached:
+            _attached[name] = _attach(name)
+        # installed again per chunk, it may have left the basis cache
+        install_basis(*grid, np.ndarray(shape, buffer=_attached[name].buf))
+    return list(sweep(chunk, **kwargs))
+
+
+@contextmanager
+def _blas_threads(count):
+    """Set the BLAS thread variables while worker processes start."""
+    saved = {var: os.environ.get(var) for var in BLAS_THREAD_VARS}
+    os.environ.update({var: str(count) for var in BLAS_THREAD_VARS})
+    try:
+        yield
+    finally:
+        for (var, value) in saved.items():
+            if value is None:
+                del os.environ[var]
+            else:
+                os.environ[var] = value
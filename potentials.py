@@ -1,11 +1,15 @@
 """Class to organize and work with various potentials easily."""
-import matplotlib.pyplot as plt
+import numpy as np
 from enum import Enum, auto
 from infinitesquarewell import InfiniteSquareWell
+from instrumentation import stage
+from accel import vectorize
 
 
 def main():
     """Test If potential plot is correct."""
+    import matplotlib.pyplot as plt
+
     ISW = InfiniteSquareWell()
     potential = PotentialType.linear
     V = potential.get_potential(ISW, 1.0)
@@ -13,135 +17,372 @@ def main():
     plt.show()
 
 
-def general_well(ISW, f):
-    """Place an infinite barrier at bounds, evals func provided elsewhere."""
-    MXVAL = 10000.0
+# name -> Potential for every potential the solver knows about
+_registry = {}
+
+
+class Potential:
+    """Registry entry: how to sample a potential and how to name it."""
+
+    __slots__ = ("name", "label", "func", "kernel", "linear")
+
+    def __init__(self, name, label, func, kernel=None, linear=False):
+        """Store the sampling function and optional exact kernel."""
+        self.name = name
+        self.label = label
+        self.func = func
+        self.kernel = kernel
+        self.linear = linear
+
+
+def register_potential(name, label, linear=False):
+    """Add func(ISW, amplitude) -> ndarray to the registry under name.
+
+    linear declares that V(amplitude) = amplitude * V(1) inside the well,
+    which lets sweeps assemble the potential matrix once per shape.
+    """
+    def decorator(func):
+        _registry[name] = Potential(name, label, func, linear=linear)
+        return func
+    return decorator
+
+
+def register_kernel(name):
+    """Attach an exact kernel(ISW, amplitude) to a registered potential."""
+    def decorator(func):
+        _registry[name].kernel = func
+        return func
+    return decorator
+
+
+def registered_potentials():
+    """Return the names of all registered potentials in insertion order."""
+    return list(_registry)
+
+
+def get_potential(choice, ISW, amplitude):
+    """Sample choice, a PotentialType or registered name, on ISW.xvals."""
+    assert(isinstance(ISW, InfiniteSquareWell))
+    potential = _lookup(choice)
+    with stage("potential", potential=potential.name, points=ISW.steps+1):
+        return potential.func(ISW, amplitude)
+
+
+def get_kernel(choice, ISW, amplitude):
+    """Return the exact matrix element kernel of choice or None."""
+    assert(isinstance(ISW, InfiniteSquareWell))
+    kernel = _lookup(choice).kernel
+    return kernel(ISW, amplitude) if kernel is not None else None
+
+
+def is_linear(choice):
+    """Return whether choice scales linearly with its amplitude."""
+    return _lookup(choice).linear
+
+
+def potential_label(choice):
+    """Return a properly formatted name for choice."""
+    return _lookup(choice).label
+
+
+def _lookup(choice):
+    """Find the registry entry of a PotentialType or name."""
+    name = getattr(choice, "name", choice)
+    try:
+        return _registry[name]
+    except KeyError:
+        raise KeyError("no potential registered as '{}'".format(name))
+
 
-    ret = [MXVAL]
+def general_well(ISW, f, scalar=None):
+    """Place an infinite barrier at bounds, evaluate f on all inner points.
 
-    for x in ISW.xvals[1:len(ISW.xvals)-1]:
-        # print('x: {}, f(x): {}'.format(x, f(x)))
-        ret.append(f(x))
+    f receives the ndarray of points strictly inside the well and returns
+    an ndarray of the same shape, or a scalar. With scalar set, f takes one
+    float at a time and is vectorized by accel.vectorize. If scalar is None
+    that is done when f fails on the array.
+    """
+    MXVAL = 10000.0
 
-    ret.append(MXVAL)
+    ret = np.empty(len(ISW.xvals), dtype=ISW.dtype)
+    inner = ISW.xvals[1:-1]
+    if scalar:
+        ret[1:-1] = vectorize(f)(inner)
+    elif scalar is None:
+        try:
+            ret[1:-1] = f(inner)
+        except (TypeError, ValueError):
+            # e.g. math functions, or an if on the truth value of an array
+            ret[1:-1] = vectorize(f)(inner)
+    else:
+        ret[1:-1] = f(inner)
+    ret[[0, -1]] = MXVAL
     return ret
 
 
+@register_potential("square", "Square Well", linear=True)
 def square(ISW, amplitude):
     """Particle in a box."""
     assert(isinstance(ISW, InfiniteSquareWell))
     return general_well(ISW, lambda x: amplitude)
 
 
+@register_potential("linear", "Linear Well", linear=True)
 def linear(ISW, amplitude):
     """Particle in an electric field."""
     assert(isinstance(ISW, InfiniteSquareWell))
     return general_well(ISW, lambda x: amplitude * x)
 
 
+@register_potential("quadratic", "Quadratic Potential", linear=True)
 def quadratic(ISW, amplitude):
     """Half-harmonic oscillator potential."""
     assert(isinstance(ISW, InfiniteSquareWell))
     return general_well(ISW, lambda x: amplitude * x * x)
 
 
+@register_potential("centered_quadratic", "Centered Quadratic Potential",
+                    linear=True)
 def centered_quadratic(ISW, amplitude):
     """Quadratic potential barrier in the center of the well."""
     assert(isinstance(ISW, InfiniteSquareWell))
+    width = ISW.well_width
+    mid = (ISW.well_max - abs(ISW.well_min)) / 2.0
 
     def centered(x):
-        width = ISW.well_width
-        mid = (ISW.well_max - abs(ISW.well_min)) / 2.0
         offset = x - mid
-        if abs(offset) < 0.25 * width:
-            return amplitude * offset * offset
-        else:
-            return 0
+        return np.where(np.abs(offset) < 0.25 * width,
+                        amplitude * offset * offset, 0.0)
     return general_well(ISW, centered)
 
 
+@register_potential("square_barrier", "Square Barrier", linear=True)
 def square_barrier(ISW, amplitude):
     """Square-shaped potential barrier."""
+    width = ISW.well_width
+    mid = (ISW.well_max - abs(ISW.well_min)) / 2.0
+
     def sqb(x):
-        width = ISW.well_width
-        mid = (ISW.well_max - abs(ISW.well_min)) / 2.0
-        offset = x - mid
-        if abs(offset) < 0.2 * 0.5 * width:
-            return amplitude
-        else:
-            return 0.0
+        return np.where(np.abs(x - mid) < 0.2 * 0.5 * width, amplitude, 0.0)
     return general_well(ISW, sqb)
 
 
+@register_potential("square_plus_linear", "Square + Linear Well", linear=True)
 def square_plus_linear(ISW, amplitude):
     """Flat Potential that turns linear after a bit."""
+    mid = (ISW.well_max + ISW.well_min) / 2.0
+
     def spl(x):
-        mid = (ISW.well_max + ISW.well_min) / 2.0
         offset = x - mid
-        if offset < 0:
-            return 0.0
-        else:
-            return amplitude * (offset)
+        return np.piecewise(offset, [offset < 0],
+                            [0.0, lambda off: amplitude * off])
     return general_well(ISW, spl)
 
 
+@register_potential("triangle_barrier", "Triangle Barrier", linear=True)
 def triangle_barrier(ISW, amplitude):
     """Triangle-Shaped Potential barrier."""
+    width = ISW.well_width
+    mid = (ISW.well_max + ISW.well_min) / 2.0
+
     def triangle(x):
-        width = ISW.well_width
-        mid = (ISW.well_max + ISW.well_min) / 2.0
-        offset = x - mid
-        if abs(offset) < 0.25*width:
-            return -amplitude*(abs(offset) - 0.25*width)
-        else:
-            return 0.0
+        offset = np.abs(x - mid)
+        return np.where(offset < 0.25*width,
+                        -amplitude*(offset - 0.25*width), 0.0)
     return general_well(ISW, triangle)
 
 
+@register_potential("coupled_quadratic", "Double Quadratic Potential",
+                    linear=True)
 def coupled_quadratic(ISW, amplitude):
     """Multiple quadratic potentials next to each other."""
+    width = ISW.well_width
+    mid = (ISW.well_max + ISW.well_min) / 2.0
+
     def cq(x):
-        width = ISW.well_width
-        mid = (ISW.well_max + ISW.well_min) / 2.0
-        offset = x - mid
-        if abs(offset) < 0.25 * width:
-            return amplitude * (abs(offset) - 0.125*width) ** 2
-        else:
-            return 0.0
+        offset = np.abs(x - mid)
+        return np.where(offset < 0.25 * width,
+                        amplitude * (offset - 0.125*width) ** 2, 0.0)
     return general_well(ISW, cq)
 
 
+@register_potential("kronig_penney", "Kronig-Penney Potential", linear=True)
 def kronig_penney(ISW, amplitude):
     """Kronig-Penney Potential to model solids."""
+    num_barriers = 5
+    spacing = ISW.well_width / (num_barriers + 1)
+    bar_wid = 2 / ((num_barriers + 1))
+    # n bars of wid d equally spaced between min and max
+    # positions of bars determined by width / (num_barriers+1)
+    centers = spacing * np.arange(1, num_barriers+1)
+
     def kp(x):
-        # 3 barriers -> 0.25 0.5 0.75
         offset = x - ISW.well_min
-        num_barriers = 5
-        spacing = ISW.well_width / (num_barriers + 1)
-        bar_wid = 2 / ((num_barriers + 1))
-        # n bars of wid d equally spaced between min and max
-        # positions of bars determined by width / (num_barriers+1)
-        # if (x - left_lim) = w / (n+1), delta site
-        for i in range(1, num_barriers+1):
-            if i*spacing - bar_wid < offset and offset < i*spacing + bar_wid:
-                return amplitude
-        else:
-            return 0
+        inside = np.zeros(offset.shape, dtype=bool)
+        for center in centers:
+            inside |= (center - bar_wid < offset) & (offset < center + bar_wid)
+        return np.where(inside, amplitude, 0.0)
     return general_well(ISW, kp)
 
+
+@register_potential("hydrogen", "Hydrogen Atom Potential", linear=True)
 def hydrogen(ISW, amplitude):
     """Hydrogen Atom potential, ampltude equivalent to charge."""
     def h_atom(x):
-        return -amplitude / abs(x) if abs(x) > 1e-3 else h_atom(2e-3)
+        r = np.abs(x)
+        return -amplitude / np.where(r > 1e-3, r, 2e-3)
     return general_well(ISW, h_atom)
 
+
+@register_potential("lennard_jones", "Lennard-Jones Potential", linear=True)
 def lennard_jones(ISW, amplitude):
     """Lennard-Jones Potential, seen here: https://en.wikipedia.org/wiki/Lennard-Jones_potential."""
     def lg(x):
-        return amplitude * (x**-12 - x**-6) if abs(x) > 1e-3 else lg(2e-3)
+        x = np.where(np.abs(x) > 1e-3, x, 2e-3)
+        return amplitude * (x**-12 - x**-6)
     return general_well(ISW, lg)
 
 
+def piecewise_kernel(ISW, pieces):
+    """Return exact matrix elements <m|V|n> of a piecewise quadratic V.
+
+    pieces is a list of (lo, hi, (c0, c1, c2)), V = c0 + c1*x + c2*x**2 on
+    lo < x < hi and zero elsewhere. The returned kernel(m, n) takes broadcast
+    arrays of basis numbers starting at 1.
+    """
+    assert(isinstance(ISW, InfiniteSquareWell))
+    return bounds_kernel(ISW.well_min, ISW.well_max, pieces)
+
+
+def bounds_kernel(well_min, well_max, pieces):
+    """piecewise_kernel for a well given only by its bounds."""
+    L = abs(well_max - well_min)
+    x0 = well_min
+
+    # polynomials in u = x - well_min, limited to the inside of the well
+    shifted = []
+    for (lo, hi, (c0, c1, c2)) in pieces:
+        lo, hi = max(lo, well_min) - x0, min(hi, well_max) - x0
+        if hi > lo:
+            coeffs = (c0 + c1*x0 + c2*x0*x0, c1 + 2.0*c2*x0, c2)
+            shifted.append((lo, hi, coeffs))
+
+    def kernel(m, n):
+        # sin*sin = (cos(m-n) - cos(m+n)) / 2, normalization 2/L
+        m, n = np.asarray(m), np.asarray(n)
+        C = _cosine_moments(shifted, L, int(np.max(m + n)))
+        return (C[np.abs(m - n)] - C[m + n]) / L
+
+    return kernel
+
+
+def _cosine_moments(pieces, L, kmax):
+    """Integrals of V(u) cos(k pi u / L) over the well for k = 0..kmax."""
+    w = np.arange(1, kmax + 1) * np.pi / L
+    C = np.zeros(kmax + 1)
+    for (lo, hi, (d0, d1, d2)) in pieces:
+        # antiderivatives of u^p cos(w u), p = 0, 1, 2
+        for u, sign in ((hi, 1.0), (lo, -1.0)):
+            s, c = np.sin(w*u), np.cos(w*u)
+            C[1:] += sign * (d0 * s/w +
+                             d1 * (u*s/w + c/w**2) +
+                             d2 * (u*u*s/w + 2.0*u*c/w**2 - 2.0*s/w**3))
+            C[0] += sign * (d0*u + d1*u**2/2.0 + d2*u**3/3.0)
+    return C
+
+
+def _shifted_quadratic(amplitude, center):
+    """Coefficients of amplitude * (x - center)**2."""
+    return (amplitude*center*center, -2.0*amplitude*center, amplitude)
+
+
+@register_kernel("square")
+def square_kernel(ISW, amplitude):
+    """Exact matrix elements of square."""
+    return piecewise_kernel(
+        ISW, [(ISW.well_min, ISW.well_max, (amplitude, 0.0, 0.0))])
+
+
+@register_kernel("linear")
+def linear_kernel(ISW, amplitude):
+    """Exact matrix elements of linear."""
+    return piecewise_kernel(
+        ISW, [(ISW.well_min, ISW.well_max, (0.0, amplitude, 0.0))])
+
+
+@register_kernel("quadratic")
+def quadratic_kernel(ISW, amplitude):
+    """Exact matrix elements of quadratic."""
+    return piecewise_kernel(
+        ISW, [(ISW.well_min, ISW.well_max, (0.0, 0.0, amplitude))])
+
+
+@register_kernel("centered_quadratic")
+def centered_quadratic_kernel(ISW, amplitude):
+    """Exact matrix elements of centered_quadratic."""
+    mid = (ISW.well_max - abs(ISW.well_min)) / 2.0
+    half = 0.25 * ISW.well_width
+    return piecewise_kernel(
+        ISW, [(mid - half, mid + half, _shifted_quadratic(amplitude, mid))])
+
+
+@register_kernel("square_barrier")
+def square_barrier_kernel(ISW, amplitude):
+    """Exact matrix elements of square_barrier."""
+    mid = (ISW.well_max - abs(ISW.well_min)) / 2.0
+    half = 0.2 * 0.5 * ISW.well_width
+    return piecewise_kernel(
+        ISW, [(mid - half, mid + half, (amplitude, 0.0, 0.0))])
+
+
+@register_kernel("square_plus_linear")
+def square_plus_linear_kernel(ISW, amplitude):
+    """Exact matrix elements of square_plus_linear."""
+    mid = (ISW.well_max + ISW.well_min) / 2.0
+    return piecewise_kernel(
+        ISW, [(mid, ISW.well_max, (-amplitude*mid, amplitude, 0.0))])
+
+
+@register_kernel("triangle_barrier")
+def triangle_barrier_kernel(ISW, amplitude):
+    """Exact matrix elements of triangle_barrier."""
+    mid = (ISW.well_max + ISW.well_min) / 2.0
+    half = 0.25 * ISW.well_width
+    return piecewise_kernel(ISW, [
+        (mid - half, mid, (amplitude*(half - mid), amplitude, 0.0)),
+        (mid, mid + half, (amplitude*(half + mid), -amplitude, 0.0))])
+
+
+@register_kernel("coupled_quadratic")
+def coupled_quadratic_kernel(ISW, amplitude):
+    """Exact matrix elements of coupled_quadratic."""
+    mid = (ISW.well_max + ISW.well_min) / 2.0
+    half = 0.25 * ISW.well_width
+    center = 0.125 * ISW.well_width
+    return piecewise_kernel(ISW, [
+        (mid - half, mid, _shifted_quadratic(amplitude, mid - center)),
+        (mid, mid + half, _shifted_quadratic(amplitude, mid + center))])
+
+
+@register_kernel("kronig_penney")
+def kronig_penney_kernel(ISW, amplitude):
+    """Exact matrix elements of kronig_penney."""
+    num_barriers = 5
+    spacing = ISW.well_width / (num_barriers + 1)
+    bar_wid = 2 / ((num_barriers + 1))
+
+    # overlapping barriers still only add amplitude once
+    pieces = []
+    for i in range(1, num_barriers+1):
+        lo = ISW.well_min + i*spacing - bar_wid
+        hi = ISW.well_min + i*spacing + bar_wid
+        if pieces and lo <= pieces[-1][1]:
+            pieces[-1] = (pieces[-1][0], hi, (amplitude, 0.0, 0.0))
+        else:
+            pieces.append((lo, hi, (amplitude, 0.0, 0.0)))
+    return piecewise_kernel(ISW, pieces)
+
+
 class PotentialType(Enum):
     """Enumeration which contains all working potential types."""
 
@@ -159,56 +400,15 @@ class PotentialType(Enum):
 
     def get_potential(self, ISW, amplitude):
         """From enum type, return the proper potential to compute."""
-        assert(isinstance(ISW, InfiniteSquareWell))
-        if self is PotentialType.square:
-            return square(ISW, amplitude)
-        elif self is PotentialType.linear:
-            return linear(ISW, amplitude)
-        elif self is PotentialType.quadratic:
-            return quadratic(ISW, amplitude)
-        elif self is PotentialType.centered_quadratic:
-            return centered_quadratic(ISW, amplitude)
-        elif self is PotentialType.square_barrier:
-            return square_barrier(ISW, amplitude)
-        elif self is PotentialType.square_plus_linear:
-            return square_plus_linear(ISW, amplitude)
-        elif self is PotentialType.triangle_barrier:
-            return triangle_barrier(ISW, amplitude)
-        elif self is PotentialType.coupled_quadratic:
-            return coupled_quadratic(ISW, amplitude)
-        elif self is PotentialType.kronig_penney:
-            return kronig_penney(ISW, amplitude)
-        elif self is PotentialType.hydrogen:
-            return hydrogen(ISW, amplitude)
-        elif self is PotentialType.lennard_jones:
-            return lennard_jones(ISW, amplitude)
+        return get_potential(self, ISW, amplitude)
+
+    def get_kernel(self, ISW, amplitude):
+        """Return the exact matrix element kernel, None if there is none."""
+        return get_kernel(self, ISW, amplitude)
 
     def to_string(self):
         """Return a properly formatted Potential Name."""
-        if self is PotentialType.square:
-            return "Square Well"
-        elif self is PotentialType.linear:
-            return "Linear Well"
-        elif self is PotentialType.quadratic:
-            return "Quadratic Potential"
-        elif self is PotentialType.centered_quadratic:
-            return "Centered Quadratic Potential"
-        elif self is PotentialType.square_barrier:
-            return "Square Barrier"
-        elif self is PotentialType.square_plus_linear:
-            return "Square + Linear Well"
-        elif self is PotentialType.triangle_barrier:
-            return "Triangle Barrier"
-        elif self is PotentialType.coupled_quadratic:
-            return "Double Quadratic Potential"
-        elif self is PotentialType.kronig_penney:
-            return "Kronig-Penney Potential"
-        elif self is PotentialType.hydrogen:
-            return "Hydrogen Atom Potential"
-        elif self is PotentialType.lennard_jones:
-            return "Lennard-Jones Potential"
-        else:
-            return ""
+        return potential_label(self)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,162 @@
+"""Content-addressed cache of solutions, in memory and optionally on disk."""
+import hashlib
+import inspect
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from infinitesquarewell import get_basis
+from solver import Solution, solve
+from precision import get_policy
+from instrumentation import count
+
+
+class SolutionCache:
+    """Remember solver.solve results by the parameters that produced them.
+
+    Solutions live in an in-memory LRU tier evicted by size. With a
+    directory they are also written there as .npz files, so other
+    processes and later runs find them too.
+    """
+
+    def __init__(self, max_bytes=256 * 2**20, directory=None):
+        """Keep at most max_bytes of arrays in memory, persist to directory."""
+        self.max_bytes = max_bytes
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+        self._memory = OrderedDict()   # key -> (Solution, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def solve(self, potential_choice, potential_amplitude, **kwargs):
+        """Return solver.solve(...) from cache, solving only on a miss."""
+        params = _canonical(potential_choice, potential_amplitude, kwargs)
+        key = _digest(params)
+
+        with self._lock:
+            entry = self._memory.pop(key, None)
+            if entry is not None:
+                self._memory[key] = entry
+                self.hits += 1
+                count("solution_cache", True, tier="memory")
+                return entry[0]
+
+        solution = self._load(key, params)
+        if solution is not None:
+            with self._lock:
+                self.disk_hits += 1
+            count("solution_cache", True, tier="disk")
+        else:
+            solution = solve(potential_choice, potential_amplitude, **kwargs)
+            with self._lock:
+                self.misses += 1
+            count("solution_cache", False)
+            self._save(key, solution)
+
+        self._remember(key, solution)
+        return solution
+
+    @property
+    def stats(self):
+        """Hit and miss counters and the size of the memory tier."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {"hits": self.hits,
+                    "disk_hits": self.disk_hits,
+                    "misses": self.misses,
+                    "evictions": self.evictions,
+                    "hit_rate": ((self.hits + self.disk_hits) / lookups
+                                 if lookups else 0.0),
+                    "entries": len(self._memory),
+                    "bytes": self._bytes}
+
+    def clear(self, disk=False):
+        """Empty the memory tier, and the disk tier too if disk is set."""
+        with self._lock:
+            self._memory.clear()
+            self._bytes = 0
+        if disk and self.directory is not None:
+            for name in os.listdir(self.directory):
+                if name.endswith(".npz"):
+                    os.remove(os.path.join(self.directory, name))
+
+    def _remember(self, key, solution):
+        """Put solution in the memory tier, evicting the oldest as needed."""
+        nbytes = (solution.energies.nbytes + solution.eigenvectors.nbytes +
+                  solution.potential.nbytes)
+        with self._lock:
+            if key in self._memory:
+                return
+            self._memory[key] = (solution, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and len(self._memory) > 1:
+                _, (_, dropped) = self._memory.popitem(last=False)
+                self._bytes -= dropped
+                self.evictions += 1
+
+    def _path(self, key):
+        """File of key in the disk tier."""
+        return os.path.join(self.directory, key + ".npz")
+
+    def _save(self, key, solution):
+        """Write solution to the disk tier, atomically."""
+        if self.directory is None:
+            return
+        partial = self._path(key) + ".{}.tmp".format(os.getpid())
+        with open(partial, "wb") as f:
+            np.savez(f, energies=solution.energies,
+                     eigenvectors=solution.eigenvectors,
+                     potential=solution.potential)
+        os.replace(partial, self._path(key))
+
+    def _load(self, key, params):
+        """Read a solution from the disk tier, None if it isn't there."""
+        if self.directory is None or not os.path.exists(self._path(key)):
+            return None
+        with np.load(self._path(key)) as data:
+            energies = data["energies"]
+            eigenvectors = data["eigenvectors"]
+            potential = data["potential"]
+        # the basis is cheap and shared, it is rebuilt rather than stored
+        n = params["e_vals"]
+        basis = get_basis(params["l_bnd"], params["r_bnd"], params["steps"],
+                          n, params["hbar"], params["mass"],
+                          get_policy(params["precision"]).storage)
+        if params["engine"] == "finite_difference":
+            # the eigenvectors already are the states on the grid
+            return Solution(energies, eigenvectors, basis.xvals, potential,
+                            None)
+        return Solution(energies, eigenvectors, basis.xvals, potential,
+                        basis.funcs[:n])
+
+
+def _canonical(potential_choice, potential_amplitude, kwargs):
+    """Every argument of solve by name, defaults filled in."""
+    bound = inspect.signature(solve).bind(
+        potential_choice, potential_amplitude, **kwargs)
+    bound.apply_defaults()
+    params = dict(bound.arguments)
+
+    potential = params.pop("potential_choice")
+    if isinstance(potential, np.ndarray):
+        samples = np.ascontiguousarray(potential, dtype=float)
+        params["potential"] = "array:" + hashlib.sha256(
+            samples.tobytes()).hexdigest()
+    else:
+        params["potential"] = getattr(potential, "name", potential)
+    return params
+
+
+def _digest(params):
+    """Stable hex key of the canonical parameters."""
+    text = json.dumps(params, sort_keys=True, default=repr)
+    return hashlib.sha256(text.encode()).hexdigest()
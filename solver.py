@@ -0,0 +1,231 @@
+"""Headless core of the solver, free of any GUI or plotting imports."""
+from collections import OrderedDict
+
+import numpy as np
+
+from potentials import get_potential, get_kernel
+from infinitesquarewell import InfiniteSquareWell
+from generatehamiltonian import compute_hamiltonian
+from eigensolvers import solve_eigensystem
+from finitedifference import solve_finite_difference
+from instrumentation import stage, count
+from precision import get_policy
+
+# ways solve can discretize the problem
+ENGINES = ("spectral", "finite_difference")
+
+
+# reconstructed eigenstates each Solution keeps around
+WAVEFUNCTION_CACHE_SIZE = 8
+
+# grid points per block when scanning all eigenstates
+SCAN_BLOCK_SIZE = 4096
+
+# relative difference up to which mirrored samples count as equal
+SYMMETRY_TOLERANCE = 1e-10
+
+
+class Solution:
+    """Energies and eigenstates of one potential in the ISW basis.
+
+    Only the basis coefficients are stored. Eigenstates on the grid are
+    built on access, solution[i] or solution.wavefunction(i), and the most
+    recently viewed ones are cached. Without a basis the eigenvectors are
+    already the states on the grid, as from the finite difference engine.
+    """
+
+    def __init__(self, energies, eigenvectors, xvals, potential, basis,
+                 block_size=None):
+        """Store the result of solve.
+
+        - energies: (k,) sorted ascending
+        - eigenvectors: (N, k) ISW basis coefficients, one state per column
+        - xvals: grid the basis and potential are sampled on
+        - potential: sampled potential, walls included
+        - basis: (N, steps+1) ISW basis functions, possibly memory-mapped,
+          or None if eigenvectors are (steps+1, k) states on the grid
+        - block_size: grid points per block when streaming over the basis
+        """
+        self.energies = energies
+        self.eigenvectors = eigenvectors
+        self.xvals = xvals
+        self.potential = potential
+        self.basis = basis
+        self.block_size = block_size
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        """Return the number of eigenstates held."""
+        return len(self.energies)
+
+    def __getitem__(self, i):
+        """Return eigenstate i on the grid, so a Solution acts like a list."""
+        if not -len(self) <= i < len(self):
+            raise IndexError("state {} out of range".format(i))
+        return self.wavefunction(i % len(self))
+
+    def wavefunction(self, i):
+        """Build eigenstate i from its coefficients, or take it from cache."""
+        func = self._cache.pop(i, None)
+        count("wavefunction_cache", func is not None)
+        if func is None:
+            func = self._states(slice(i, i+1), slice(None))[0]
+        self._cache[i] = func
+        while len(self._cache) > WAVEFUNCTION_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return func
+
+    def wavefunctions(self, out=None):
+        """Return every eigenstate as a (k, steps+1) array.
+
+        In memory this is one matrix product. With out, a file name, the
+        states go to a memory-mapped file instead, written block_size grid
+        points at a time.
+        """
+        with stage("reconstruction", states=len(self),
+                   points=len(self.xvals), out=out):
+            if out is None:
+                return self._states(slice(None), slice(None))
+
+            shape = (len(self), len(self.xvals))
+            dtype = self.eigenvectors.dtype
+            if self.basis is not None:
+                dtype = np.result_type(dtype, self.basis)
+            funcs = np.memmap(out, dtype=dtype, mode="w+", shape=shape)
+            for cols in self._blocks(self.block_size):
+                funcs[:, cols] = self._states(slice(None), cols)
+            funcs.flush()
+            return funcs
+
+    def max_abs(self):
+        """Largest |psi| over all states without keeping them in memory."""
+        largest = 0.0
+        for cols in self._blocks(self.block_size or SCAN_BLOCK_SIZE):
+            block = self._states(slice(None), cols)
+            largest = max(largest, float(np.max(np.abs(block))))
+        return largest
+
+    def _states(self, which, cols):
+        """States which on grid points cols, as rows."""
+        if self.basis is None:
+            return self.eigenvectors[cols, which].T
+        return self.eigenvectors[:, which].T @ self.basis[:, cols]
+
+    def _blocks(self, block_size):
+        """Slices covering the grid block_size points at a time."""
+        points = len(self.xvals)
+        block_size = block_size or points
+        return [slice(start, start + block_size)
+                for start in range(0, points, block_size)]
+
+
+def solve(potential_choice, potential_amplitude, e_vals=10, l_bnd=-5.0,
+          r_bnd=5.0, k=None, method="auto", analytic=True,
+          assembly="quadrature", steps=200, hbar=1.0, mass=1.0,
+          storage=None, block_size=None, engine="spectral", fd_order=2,
+          precision=None, symmetry="auto"):
+    """Solve the particle in a box problem, see main.solve_problem.
+
+    potential_choice may also be an array of steps+1 potential samples,
+    which is scaled by potential_amplitude. storage and block_size select
+    the out-of-core mode of InfiniteSquareWell.
+
+    engine="finite_difference" discretizes the problem on the grid with a
+    stencil of accuracy fd_order instead of using the ISW basis. It keeps
+    the lowest k states, e_vals of them if k is None.
+
+    precision is a precision.DtypePolicy or the name of one, "double" if
+    None; "mixed" keeps basis, potential, assembly and eigenvectors in
+    float32 but diagonalizes in float64.
+
+    A potential symmetric about the center of the well only couples basis
+    functions of equal parity, so the odd and even n are assembled and
+    diagonalized as two independent blocks. symmetry="auto" checks the
+    samples with is_symmetric, True declares the potential symmetric and
+    False always solves the full matrix.
+    """
+    policy = get_policy(precision)
+    name = "custom" if isinstance(potential_choice, np.ndarray) else \
+        getattr(potential_choice, "name", potential_choice)
+    with stage("solve", potential=name, size=e_vals, points=steps+1,
+               engine=engine):
+        # get infinite square well basis
+        ISW = InfiniteSquareWell(energy_eigenvals=e_vals, steps=steps,
+                                 well_min=l_bnd, well_max=r_bnd,
+                                 hbar=hbar, mass=mass, storage=storage,
+                                 block_size=block_size,
+                                 dtype=policy.storage)
+        # choose potential
+        potential = potential_choice
+        custom = isinstance(potential, np.ndarray)
+        if custom:
+            V = (potential_amplitude * potential).astype(policy.storage)
+        else:
+            V = get_potential(potential, ISW, potential_amplitude)
+
+        if engine == "finite_difference":
+            with stage("eigensolve", size=ISW.steps-1, engine=engine):
+                vals, states = solve_finite_difference(
+                    V, ISW, k=e_vals if k is None else k, order=fd_order)
+            return Solution(vals, states.astype(policy.storage, copy=False),
+                            ISW.xvals, V, None)
+        if engine != "spectral":
+            raise ValueError("unknown engine '{}', expected one of {}"
+                             .format(engine, ENGINES))
+
+        # compute hamiltonian matrix from the potential
+        kernel = None
+        if analytic and not custom:
+            kernel = get_kernel(potential, ISW, potential_amplitude)
+        if symmetry == "auto":
+            symmetry = is_symmetric(V)
+        if symmetry and ISW.energy_eigenvals > 1:
+            vals, vecs = _solve_parities(V, ISW, kernel, assembly, k, method,
+                                         policy)
+        else:
+            H = compute_hamiltonian(V, ISW, kernel=kernel, method=assembly,
+                                    dtype=policy.assembly)
+
+            # diagonalize hamiltonian, eigenvals come back sorted ascending
+            with stage("eigensolve", size=len(H), k=k, method=method):
+                vals, vecs = solve_eigensystem(
+                    H.astype(policy.eigensolve, copy=False), k=k,
+                    method=method)
+
+        # eigenstates on the grid are only built when asked for
+        return Solution(vals, vecs.astype(policy.storage, copy=False),
+                        ISW.xvals, V, ISW.basis_funcs,
+                        block_size=ISW.block_size)
+
+
+def is_symmetric(V, tol=SYMMETRY_TOLERANCE):
+    """Return whether samples V mirror about the center of the well."""
+    V = np.asarray(V)
+    scale = float(np.max(np.abs(V[1:-1]))) if len(V) > 2 else 0.0
+    return bool(np.allclose(V, V[::-1], rtol=tol, atol=tol * scale))
+
+
+def _solve_parities(V, ISW, kernel, assembly, k, method, policy):
+    """Diagonalize the odd and even n blocks, merged by energy.
+
+    Returns (vals, vecs) like solve_eigensystem on the whole matrix, each
+    eigenvector zero on the basis functions of the other parity.
+    """
+    n = ISW.energy_eigenvals
+    vals, vecs = [], []
+    for states in (np.arange(0, n, 2), np.arange(1, n, 2)):
+        H = compute_hamiltonian(V, ISW, kernel=kernel, method=assembly,
+                                dtype=policy.assembly, states=states)
+        wanted = None if k is None else min(k, len(states))
+        with stage("eigensolve", size=len(H), k=wanted, method=method):
+            block_vals, block_vecs = solve_eigensystem(
+                H.astype(policy.eigensolve, copy=False), k=wanted,
+                method=method)
+        full = np.zeros((n, len(block_vals)), dtype=block_vecs.dtype)
+        full[states] = block_vecs
+        vals.append(block_vals)
+        vecs.append(full)
+
+    vals, vecs = np.concatenate(vals), np.concatenate(vecs, axis=1)
+    order = np.argsort(vals, kind="stable")[:k]
+    return vals[order], vecs[:, order]
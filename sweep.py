@@ -0,0 +1,97 @@
+"""Solve many potential configurations without the GUI."""
+from collections import namedtuple, OrderedDict
+from itertools import product
+
+import numpy as np
+import numpy.linalg as la
+
+from potentials import get_potential, get_kernel, is_linear
+from infinitesquarewell import InfiniteSquareWell
+from generatehamiltonian import potential_matrix
+
+# one configuration to solve
+SweepPoint = namedtuple("SweepPoint",
+                        ["potential", "amplitude", "l_bnd", "r_bnd", "e_vals"])
+
+# energies (k,) and basis coefficients (e_vals, k) of one configuration
+SweepResult = namedtuple("SweepResult", ["point", "energies", "vectors"])
+
+# potential matrices at unit amplitude kept between batches
+UNIT_CACHE_SIZE = 16
+
+
+def parameter_grid(potentials, amplitudes, bounds, e_vals):
+    """Yield a SweepPoint for every combination, amplitude varying fastest.
+
+    bounds is a sequence of (l_bnd, r_bnd) pairs and e_vals a sequence of
+    basis sizes. Keeping the amplitude innermost lets sweep reuse one
+    potential matrix for a whole run of points.
+    """
+    for potential, (l_bnd, r_bnd), n, amplitude in product(
+            potentials, bounds, e_vals, amplitudes):
+        yield SweepPoint(potential, amplitude, l_bnd, r_bnd, n)
+
+
+def sweep(points, steps=200, k=None, batch_size=64, analytic=True,
+          assembly="quadrature"):
+    """Solve every point in order, yielding a SweepResult for each.
+
+    Consecutive points sharing potential, bounds and e_vals form a batch.
+    For potentials linear in the amplitude the hamiltonian is H0 + a*V1, so
+    V1 is assembled once and the whole batch is diagonalized by one eigh on
+    a stacked (batch, N, N) array.
+    """
+    unit_cache = OrderedDict()
+    batch = []
+    for point in points:
+        point = SweepPoint(*point)
+        if batch and (_grid_key(point) != _grid_key(batch[0]) or
+                      len(batch) == batch_size):
+            yield from _solve_batch(batch, steps, k, analytic, assembly,
+                                    unit_cache)
+            batch = []
+        batch.append(point)
+    if batch:
+        yield from _solve_batch(batch, steps, k, analytic, assembly,
+                                unit_cache)
+
+
+def _grid_key(point):
+    """Points with equal keys share a basis and a unit potential matrix."""
+    return (point.potential, point.l_bnd, point.r_bnd, point.e_vals)
+
+
+def _solve_batch(batch, steps, k, analytic, assembly, unit_cache):
+    """Diagonalize a batch of points that share a grid key."""
+    first = batch[0]
+    ISW = InfiniteSquareWell(energy_eigenvals=first.e_vals, steps=steps,
+                             well_min=first.l_bnd, well_max=first.r_bnd)
+    amplitudes = np.array([point.amplitude for point in batch], dtype=float)
+
+    if is_linear(first.potential):
+        key = (_grid_key(first), steps, analytic, assembly)
+        V1 = unit_cache.pop(key, None)
+        if V1 is None:
+            V1 = _potential_matrix(ISW, first.potential, 1.0, analytic,
+                                   assembly)
+        unit_cache[key] = V1
+        while len(unit_cache) > UNIT_CACHE_SIZE:
+            unit_cache.popitem(last=False)
+        stack = amplitudes[:, None, None] * V1
+    else:
+        stack = np.array([
+            _potential_matrix(ISW, first.potential, a, analytic, assembly)
+            for a in amplitudes])
+
+    stack[:, np.arange(first.e_vals), np.arange(first.e_vals)] += \
+        ISW.eigenvals
+    vals, vecs = la.eigh(stack)
+    for (i, point) in enumerate(batch):
+        yield SweepResult(point, vals[i, :k], vecs[i, :, :k])
+
+
+def _potential_matrix(ISW, potential, amplitude, analytic, assembly):
+    """Assemble <m|V|n> for one amplitude."""
+    V = get_potential(potential, ISW, amplitude)
+    kernel = get_kernel(potential, ISW, amplitude) if analytic else None
+    return potential_matrix(V, ISW, kernel=kernel, method=assembly)
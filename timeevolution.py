@@ -0,0 +1,67 @@
+"""Propagate a wavefunction in time using the eigenstates of a Solution.
+
+With psi(0) = sum c_j phi_j, psi(t) = sum c_j exp(-i E_j t / hbar) phi_j,
+so after projecting the initial state once, every time step is a phase
+rotation of k coefficients. A batch of times is one outer product for the
+phases and one matrix product back onto the grid.
+"""
+from itertools import islice
+
+import numpy as np
+
+# time steps turned into frames by one matrix product
+FRAME_BATCH_SIZE = 64
+
+
+def gaussian_packet(xvals, center, width, momentum=0.0, hbar=1.0):
+    """Normalized gaussian wavepacket exp(-(x-center)^2 / 4 width^2 + ipx)."""
+    xvals = np.asarray(xvals)
+    psi = np.exp(-((xvals - center) / (2.0 * width)) ** 2 +
+                 1j * momentum * xvals / hbar)
+    psi[[0, -1]] = 0.0  # nothing gets past the walls
+    step = xvals[1] - xvals[0]
+    return psi / np.sqrt(np.sum(np.abs(psi) ** 2) * step)
+
+
+class Propagator:
+    """Evolve one initial state in the eigenbasis of a Solution."""
+
+    def __init__(self, solution, psi0, hbar=1.0):
+        """Project psi0, sampled on solution.xvals, onto the eigenstates.
+
+        Parts of psi0 outside the span of the k states are lost; captured
+        is the fraction of its norm that is kept.
+        """
+        self.energies = np.asarray(solution.energies)
+        self.xvals = solution.xvals
+        self.hbar = hbar
+        self.states = solution.wavefunctions()  # (k, steps+1), real
+
+        psi0 = np.asarray(psi0)
+        step = self.xvals[1] - self.xvals[0]
+        self.coefficients = self.states @ psi0 * step
+        norm = np.sum(np.abs(psi0) ** 2) * step
+        self.captured = float(np.sum(np.abs(self.coefficients) ** 2) / norm)
+
+    def state(self, t):
+        """Return psi(t) on the grid."""
+        return self.coefficients * self._phases(np.array([t]))[0] @ \
+            self.states
+
+    def frames(self, times, batch_size=FRAME_BATCH_SIZE):
+        """Yield (t, psi(t)) for every t in times, in order.
+
+        times may be any iterable, even an endless one. Only batch_size
+        frames are held in memory at a time.
+        """
+        times = iter(times)
+        while True:
+            batch = np.fromiter(islice(times, batch_size), float)
+            if len(batch) == 0:
+                return
+            frames = (self.coefficients * self._phases(batch)) @ self.states
+            yield from zip(batch, frames)
+
+    def _phases(self, times):
+        """exp(-i E t / hbar) as a (len(times), k) array."""
+        return np.exp(-1j / self.hbar * np.outer(times, self.energies))